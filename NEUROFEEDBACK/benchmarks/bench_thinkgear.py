@@ -0,0 +1,230 @@
+"""
+bench_thinkgear.py — Benchmarks del decodificador ThinkGear de NEURODAC
+DUNNE · División Universitaria de Neuroingeniería
+
+Alimenta flujos de bytes pregenerados (raw, eSense, potencias ASIC y tramas
+corruptas) al decodificador de NeuroSkyInterface sin hardware y reporta
+paquetes/s, bytes/s, latencia por paquete y memoria asignada, con una tabla
+al estilo de pytest-benchmark.
+
+Uso:
+    python benchmarks/bench_thinkgear.py [--seconds 60] [--rounds 7]
+                                         [--corrupt-rate 0.01]
+                                         [--save base.json] [--compare base.json]
+
+Con --save se guardan los resultados; con --compare se muestra el cambio de
+la media respecto a una ejecución guardada, para detectar regresiones.
+"""
+
+import argparse
+import io
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import serial
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.neurosky_interface import NeuroSkyInterface
+from modules.neurosky_simulator import (
+    SyntheticSource, encode_esense_packet, RAW_PACKET_SIZE, SIM_SAMPLE_FREQ
+)
+
+READ_CHUNK = NeuroSkyInterface.READ_CHUNK
+
+
+# =============================================================
+# Flujos de prueba
+# =============================================================
+def build_stream(seconds, corrupt_rate=0.0, seed=0):
+    """
+    Genera `seconds` segundos de tramas (512 raw + 1 eSense/ASIC por segundo).
+    Con corrupt_rate > 0, esa fracción de tramas raw tiene un byte de payload
+    alterado y se intercalan bytes basura entre tramas.
+    """
+    source = SyntheticSource(seed)
+    rng = np.random.default_rng(seed)
+    blocks = []
+    for _ in range(seconds):
+        block = bytearray(source.next_block())
+        if corrupt_rate > 0:
+            n_bad = rng.binomial(SIM_SAMPLE_FREQ, corrupt_rate)
+            for idx in rng.choice(SIM_SAMPLE_FREQ, n_bad, replace=False):
+                block[idx * RAW_PACKET_SIZE + 5] ^= 0x5a
+            block += bytes(rng.integers(0, 256, int(rng.integers(0, 8)), dtype=np.uint8))
+        blocks.append(bytes(block))
+    return b''.join(blocks)
+
+
+class MemorySerial(io.BytesIO):
+    """Puerto serial en memoria para el modo byte por byte; al agotarse lanza SerialException."""
+
+    def read(self, size=1):
+        data = super().read(size)
+        if len(data) < size:
+            raise serial.SerialException("fin del flujo")
+        return data
+
+
+def make_listener():
+    """Listener conectado a una interfaz sin puerto, con un manejador raw mínimo."""
+    interface = NeuroSkyInterface(None, open_serial=False)
+    interface.raw_value_handlers.append(lambda iface, value: None)
+    interface.waves_handlers.append(lambda iface, waves: None)
+    interface.running = True
+    return interface, NeuroSkyInterface.SerialListener(interface)
+
+
+# =============================================================
+# Casos
+# =============================================================
+def case_parse_payload_raw(stream):
+    """parse_payload sobre payloads raw (0x80) ya extraídos."""
+    payloads = [stream[i + 3:i + 7] for i in range(0, SIM_SAMPLE_FREQ * RAW_PACKET_SIZE, RAW_PACKET_SIZE)]
+    payloads *= max(1, len(stream) // (len(payloads) * RAW_PACKET_SIZE))
+
+    def run():
+        interface, listener = make_listener()
+        for payload in payloads:
+            listener.parse_payload(payload)
+        return len(payloads), len(payloads) * 4
+    return run
+
+
+def case_parse_payload_esense(stream):
+    """parse_payload sobre el payload de 1 Hz (señal pobre + ASIC + eSense)."""
+    packet = encode_esense_packet(0, 50, 50, range(1000, 9000, 1000))
+    payload = packet[3:-1]
+    count = max(1, len(stream) // len(packet))
+
+    def run():
+        interface, listener = make_listener()
+        for _ in range(count):
+            listener.parse_payload(payload)
+        return count, count * len(payload)
+    return run
+
+
+def case_frame_loop_buffered(stream):
+    """Modo con búfer: bloques de READ_CHUNK bytes decodificados con parse_buffer."""
+    chunks = [stream[i:i + READ_CHUNK] for i in range(0, len(stream), READ_CHUNK)]
+
+    def run():
+        interface, listener = make_listener()
+        buf = bytearray()
+        for chunk in chunks:
+            buf += chunk
+            consumed = listener.parse_buffer(buf)
+            if consumed:
+                del buf[:consumed]
+        return interface.frames_ok, len(stream)
+    return run
+
+
+def case_frame_loop_bytewise(stream):
+    """Modo original: una lectura por byte de SYNC, longitud y checksum."""
+    def run():
+        interface, listener = make_listener()
+        listener.read_bytewise(MemorySerial(stream))
+        return interface.frames_ok, len(stream)
+    return run
+
+
+CASES = [
+    ('parse_payload[raw]', case_parse_payload_raw, False),
+    ('parse_payload[esense+asic]', case_parse_payload_esense, False),
+    ('frame_loop[buffered]', case_frame_loop_buffered, False),
+    ('frame_loop[buffered,corrupt]', case_frame_loop_buffered, True),
+    ('frame_loop[bytewise]', case_frame_loop_bytewise, False),
+    ('frame_loop[bytewise,corrupt]', case_frame_loop_bytewise, True),
+]
+
+
+# =============================================================
+# Medición y reporte
+# =============================================================
+def measure(run, rounds):
+    """Ejecuta `run` una vez para calentar, `rounds` veces cronometradas y una con tracemalloc."""
+    run()
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        packets, nbytes = run()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    mean = statistics.mean(times)
+    return {
+        'min': min(times), 'max': max(times), 'mean': mean,
+        'stddev': statistics.stdev(times) if len(times) > 1 else 0.0,
+        'median': statistics.median(times), 'rounds': rounds,
+        'packets': packets, 'bytes': nbytes,
+        'packets_per_s': packets / mean, 'mb_per_s': nbytes / mean / 1e6,
+        'us_per_packet': mean / packets * 1e6 if packets else 0.0,
+        'peak_kib': peak / 1024,
+    }
+
+
+def print_table(results, baseline=None):
+    """Imprime los resultados en una tabla al estilo de pytest-benchmark."""
+    columns = ['Min', 'Max', 'Mean', 'StdDev', 'Median', 'Rounds', 'Packets/s', 'MB/s', 'us/packet', 'Peak KiB']
+    if baseline:
+        columns.append('vs base')
+    name_width = max(len('Name (time in ms)'), *(len(name) for name in results))
+    header = f"{'Name (time in ms)':<{name_width}}" + ''.join(f"{col:>12}" for col in columns)
+    title = f" benchmark: {len(results)} tests "
+    print(title.center(len(header), '-'))
+    print(header)
+    print('-' * len(header))
+    for name, r in results.items():
+        row = [f"{r['min'] * 1e3:.3f}", f"{r['max'] * 1e3:.3f}", f"{r['mean'] * 1e3:.3f}",
+               f"{r['stddev'] * 1e3:.3f}", f"{r['median'] * 1e3:.3f}", str(r['rounds']),
+               f"{r['packets_per_s']:,.0f}", f"{r['mb_per_s']:.2f}", f"{r['us_per_packet']:.2f}",
+               f"{r['peak_kib']:.1f}"]
+        if baseline:
+            base = baseline.get(name)
+            row.append(f"{(r['mean'] / base['mean'] - 1) * 100:+.1f}%" if base else 'n/a')
+        print(f"{name:<{name_width}}" + ''.join(f"{cell:>12}" for cell in row))
+    print('-' * len(header))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks del decodificador ThinkGear.")
+    parser.add_argument('--seconds', type=int, default=60, help="Segundos de señal simulada por flujo.")
+    parser.add_argument('--rounds', type=int, default=7, help="Repeticiones cronometradas por caso.")
+    parser.add_argument('--corrupt-rate', type=float, default=0.01, help="Fracción de tramas raw corruptas.")
+    parser.add_argument('--save', help="Guardar resultados en un JSON.")
+    parser.add_argument('--compare', help="Comparar contra resultados guardados con --save.")
+    args = parser.parse_args()
+
+    clean = build_stream(args.seconds)
+    corrupt = build_stream(args.seconds, args.corrupt_rate, seed=1)
+    print(f"Flujo limpio: {len(clean) / 1e6:.2f} MB · corrupto ({args.corrupt_rate:.1%}): {len(corrupt) / 1e6:.2f} MB")
+
+    results = {}
+    for name, factory, use_corrupt in CASES:
+        results[name] = measure(factory(corrupt if use_corrupt else clean), args.rounds)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as fh:
+            baseline = json.load(fh)
+    print_table(results, baseline)
+
+    if args.save:
+        with open(args.save, 'w') as fh:
+            json.dump(results, fh, indent=2)
+        print(f"Resultados guardados en {args.save}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,146 +3,513 @@ set_to_csv.py — Convertidor de archivos EEGLAB (.set) a CSV para NEURODAC
 DUNNE · División Universitaria de Neuroingeniería
 
 Uso:
-    python set_to_csv.py archivo.set [archivo_salida.csv]
+    python set_to_csv.py archivo.set [archivo_salida.csv | .ndr | .parquet]
+    python set_to_csv.py estudio/ "sub-*/eeg/*.set" [-o salida/] [--format ndr] [-j 8] [-r]
 
-Si no se especifica nombre de salida, se genera automáticamente.
+Si no se especifica nombre de salida, se genera automáticamente (CSV).
+Si la salida termina en .ndr se escribe el formato binario de grabación de
+NEURODAC, que la página de visualización abre sin convertir texto; si termina
+en .parquet, un archivo columnar comprimido (requiere pyarrow) del que la
+página lee sólo los canales que grafica.
 Compatible con archivos .set continuos (raw) y con epochs (los concatena).
+Con directorios o patrones glob se convierten todos los .set encontrados en
+paralelo (un proceso por archivo) y se omiten los que ya están al día según
+el manifiesto MANIFEST_FILE del directorio de salida.
+
+La conversión se hace por bloques de CHUNK_SAMPLES muestras y el .set (o su
+.fdt) se lee una sola vez: cada bloque se escala a µV y se copia a un archivo
+temporal float32 junto a la salida mientras se acumulan la media y el rango de
+cada canal; después, del archivo temporal, se resta el offset DC, se redondea
+y se escribe. Con los datos en un .fdt aparte la memoria usada no depende de
+la duración de la grabación.
 """
 
+import argparse
+import contextlib
+import glob
+import io
+import json
 import sys
 import os
+import tempfile
 import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import numpy as np
 import pandas as pd
 import mne
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from modules.recording import (
+    encode_recording_header, import_pyarrow, RECORDING_EXT, RECORDING_VERSION,
+    PARQUET_EXT, PARQUET_METADATA_KEY, PARQUET_COMPRESSION,
+)
 
-def convert_set_to_csv(input_path, output_path=None):
+CHUNK_SAMPLES = 65536  # Muestras por bloque en la conversión
+SAMPLE_DTYPE = '<i4'  # Tipo de los canales redondeados a µV
+OUTPUT_FORMATS = ('csv', RECORDING_EXT.lstrip('.'), PARQUET_EXT.lstrip('.'))
+MANIFEST_FILE = '.set_to_csv.json'  # Conversiones hechas en un directorio de salida
+
+
+def open_set(input_path):
     """
-    Convierte un archivo EEGLAB .set a CSV compatible con NEURODAC.
-    
-    Parámetros:
-        input_path (str): Ruta al archivo .set
-        output_path (str): Ruta de salida para el CSV. Si es None, se genera automáticamente.
-    
-    Retorna:
-        str: Ruta del archivo CSV generado.
+    Abrir un .set sin cargar la señal (si está en un .fdt aparte).
+    :param input_path: Ruta al archivo .set
+    :return: Tupla (read_block, ch_names, sfreq, n_samples); read_block(start, stop)
+             regresa un arreglo nuevo (canales x muestras) en Volts, que se puede
+             modificar en su lugar.
     """
-    if not os.path.exists(input_path):
-        raise FileNotFoundError(f"No se encontró el archivo: {input_path}")
-    
-    if not input_path.lower().endswith('.set'):
-        raise ValueError("El archivo debe tener extensión .set")
-    
-    # Generar nombre de salida si no se especificó
-    if output_path is None:
-        base = os.path.splitext(os.path.basename(input_path))[0]
-        output_path = os.path.join(os.path.dirname(input_path), f"{base}.csv")
-    
-    print(f"Leyendo: {input_path}")
-    
     # --- Intentar leer como raw (continuo) ---
-    raw = None
     try:
-        raw_data = mne.io.read_raw_eeglab(input_path, preload=True, verbose=False)
+        raw_data = mne.io.read_raw_eeglab(input_path, preload=False, verbose=False)
         print(f"  Tipo: Señal continua (raw)")
         print(f"  Canales: {len(raw_data.ch_names)}")
         print(f"  Frecuencia de muestreo: {raw_data.info['sfreq']} Hz")
         print(f"  Duración: {raw_data.times[-1]:.2f} segundos")
         print(f"  Muestras: {raw_data.n_times}")
-        
-        data = raw_data.get_data()  # shape: (n_channels, n_samples)
-        ch_names = raw_data.ch_names
-        sfreq = raw_data.info['sfreq']
-        n_samples = raw_data.n_times
-        
+
+        def read_block(start, stop):
+            return raw_data.get_data(start=start, stop=stop)
+
+        return read_block, raw_data.ch_names, raw_data.info['sfreq'], raw_data.n_times
+
     except TypeError:
         # --- Si falla, leer como epochs y concatenar ---
         print("  Detectado como archivo con epochs; concatenando...")
         epochs = mne.io.read_epochs_eeglab(input_path, verbose=False)
-        
-        n_epochs, n_channels, n_times_per_epoch = epochs.get_data().shape
+
+        # Una sola lectura de los datos, sin copia (n_epochs, n_channels, n_times)
+        epoch_data = epochs.get_data(copy=False)
+        n_epochs, n_channels, n_times_per_epoch = epoch_data.shape
         print(f"  Tipo: Epochs ({n_epochs} epochs de {n_times_per_epoch} muestras)")
         print(f"  Canales: {n_channels}")
         print(f"  Frecuencia de muestreo: {epochs.info['sfreq']} Hz")
-        
-        # Concatenar epochs en una señal continua
-        # Shape: (n_epochs, n_channels, n_times) -> (n_channels, n_epochs * n_times)
-        epoch_data = epochs.get_data()
-        data = np.concatenate([epoch_data[i] for i in range(n_epochs)], axis=1)
-        
-        ch_names = epochs.ch_names
+
         sfreq = epochs.info['sfreq']
-        n_samples = data.shape[1]
-        
+        n_samples = n_epochs * n_times_per_epoch
         print(f"  Total de muestras concatenadas: {n_samples}")
         print(f"  Duración total: {n_samples / sfreq:.2f} segundos")
-    
-    # --- Generar timestamps ---
-    # Usar tiempo actual como base (similar al formato del CSV original)
-    base_timestamp = time.time()
-    timestamps = base_timestamp + np.arange(n_samples) / sfreq
-    
-    # --- Determinar si los datos ya están en µV o en Volts ---
-    # MNE lee en Volts, pero algunos archivos .set ya almacenan en µV.
-    # Si la media absoluta de los canales es > 1 (en "Volts"), es porque
-    # los datos ya estaban en µV y MNE no los escaló correctamente.
-    mean_abs = np.mean(np.abs(data.mean(axis=1)))
-    
-    if mean_abs > 0.1:  # Los datos ya están en µV (MNE los leyó sin escalar)
-        data_uv = data * 1e6  # MNE asume Volts; si el .set ya tiene µV, esto da valores enormes
-        # Revertir: usar los datos crudos directamente del archivo
-        import scipy.io
-        mat = scipy.io.loadmat(input_path, squeeze_me=True)
-        raw_values = mat['data']
-        if raw_values.shape[0] == len(ch_names):
-            data_uv = raw_values.astype(float)
-            print(f"  Datos le\u00EDdos directamente del .set (ya en \u00B5V)")
+
+        def read_block(start, stop):
+            # Concatenar sólo los epochs del bloque: (epochs, canales, muestras) ->
+            # (canales, epochs * muestras) con una transposición copiada a un arreglo nuevo
+            first, last = start // n_times_per_epoch, -(-stop // n_times_per_epoch)
+            block = np.empty((n_channels, last - first, n_times_per_epoch))
+            block[...] = epoch_data[first:last].transpose(1, 0, 2)
+            offset = first * n_times_per_epoch
+            return block.reshape(n_channels, -1)[:, start - offset:stop - offset]
+
+        return read_block, epochs.ch_names, sfreq, n_samples
+
+
+def iter_blocks(read_block, n_samples, chunk_samples=CHUNK_SAMPLES):
+    """
+    Recorrer la señal por bloques.
+    :param read_block: Función (start, stop) -> arreglo (canales x muestras).
+    :param n_samples: Número total de muestras.
+    :param chunk_samples: Muestras por bloque.
+    :return: Generador de tuplas (start, bloque).
+    """
+    for start in range(0, n_samples, chunk_samples):
+        stop = min(start + chunk_samples, n_samples)
+        yield start, read_block(start, stop)
+
+
+def stored_in_microvolts(means):
+    """
+    Detectar si el .set ya almacena µV: si la media absoluta de los canales es
+    > 0.1 (en "Volts" según MNE), los datos no estaban en Volts.
+    :param means: Media de cada canal tal como la regresa MNE (de stage_blocks()).
+    :return: True si los datos están en µV.
+    """
+    return bool(np.mean(np.abs(means)) > 0.1)
+
+
+def stage_blocks(read_block, n_samples, staged, scale):
+    """
+    Única lectura de la señal: cada bloque se escala y se copia a `staged`
+    mientras se acumulan la media, el mínimo y el máximo de cada canal.
+    :param staged: Arreglo (canales x muestras) float32, p. ej. un np.memmap temporal.
+    :param scale: Factor a µV.
+    :return: Tupla (means, lows, highs) de arreglos (canales,), en las unidades de MNE.
+    """
+    total = lows = highs = None
+    for start, block in iter_blocks(read_block, n_samples):
+        block_sum = block.sum(axis=1, dtype=np.float64)
+        if total is None:
+            total, lows, highs = block_sum, block.min(axis=1), block.max(axis=1)
         else:
-            data_uv = data * 1e6
-            print(f"  Advertencia: no se pudo leer data cruda; usando conversi\u00F3n est\u00E1ndar")
-    else:
-        # Datos en Volts (caso normal); convertir a µV
-        data_uv = data * 1e6
-        print(f"  Datos convertidos de Volts a \u00B5V")
-    
-    # --- Remover offset DC (restar media de cada canal) ---
-    for i in range(data_uv.shape[0]):
-        data_uv[i] -= data_uv[i].mean()
-    print(f"  Offset DC removido (media restada por canal)")
-    
-    df = pd.DataFrame(data_uv.T, columns=ch_names)
-    df.insert(0, 'Timestamp', timestamps)
-    
-    # Redondear los valores de señal a enteros (como en el CSV original)
-    for col in ch_names:
-        df[col] = df[col].round(0).astype(int)
-    
-    # --- Guardar CSV ---
-    df.to_csv(output_path, index=False)
-    
-    print(f"\nCSV generado: {output_path}")
-    print(f"  Filas: {len(df)}")
-    print(f"  Columnas: {list(df.columns[:5])}... ({len(df.columns)} total)")
+            total += block_sum
+            np.minimum(lows, block.min(axis=1), out=lows)
+            np.maximum(highs, block.max(axis=1), out=highs)
+        block *= scale
+        staged[:, start:start + block.shape[1]] = block
+    return total / n_samples, lows, highs
+
+
+def channel_dtypes(lows, highs):
+    """
+    Tipo entero más pequeño (int16 o int32) en el que cabe cada canal ya redondeado.
+    :param lows: Mínimo de cada canal en µV (sin offset).
+    :param highs: Máximo de cada canal en µV (sin offset).
+    """
+    info = np.iinfo(np.int16)
+    fits = (np.rint(lows) >= info.min) & (np.rint(highs) <= info.max)
+    return ['<i2' if fit else SAMPLE_DTYPE for fit in fits]
+
+
+class CSVBlockWriter:
+    """Escribe la señal por bloques como CSV (Timestamp y un canal por columna)."""
+
+    def __init__(self, path, ch_names, sfreq, dtypes=None):
+        self.path = path
+        self.ch_names = list(ch_names)
+        self.file_handle = open(path, 'w', newline='')
+        self.file_handle.write(','.join(['Timestamp'] + self.ch_names) + '\n')
+
+    def write(self, timestamps, values):
+        """
+        :param timestamps: Arreglo (muestras,) en segundos.
+        :param values: Arreglo entero (canales x muestras).
+        """
+        df = pd.DataFrame(values.T, columns=self.ch_names)
+        df.insert(0, 'Timestamp', timestamps)
+        df.to_csv(self.file_handle, header=False, index=False, float_format='%.6f')
+
+    def close(self):
+        self.file_handle.close()
+
+
+class NDRBlockWriter:
+    """
+    Escribe la señal por bloques en el formato binario de grabación (.ndr),
+    con registros (Timestamp, <canal 1>, <canal 2>, ...).
+    """
+
+    def __init__(self, path, ch_names, sfreq, dtypes=None):
+        self.path = path
+        dtypes = dtypes or [SAMPLE_DTYPE] * len(ch_names)
+        self.dtype = np.dtype([('Timestamp', '<f8')] + list(zip(ch_names, dtypes)))
+        self.file_handle = open(path, 'wb')
+        self.file_handle.write(encode_recording_header({
+            'version': RECORDING_VERSION,
+            'dtype': self.dtype.descr,
+            'signals': list(ch_names),
+            'sfreq': sfreq,
+            'created': time.time(),
+        }))
+
+    def write(self, timestamps, values):
+        block = np.empty(len(timestamps), dtype=self.dtype)
+        block['Timestamp'] = timestamps
+        for i, ch in enumerate(self.dtype.names[1:]):
+            block[ch] = values[i]
+        self.file_handle.write(block.tobytes())
+
+    def close(self):
+        self.file_handle.close()
+
+
+class ParquetBlockWriter:
+    """
+    Escribe la señal por bloques en un .parquet: Timestamp float64 y una columna
+    entera por canal, con un grupo de filas por bloque. La frecuencia de muestreo
+    y los canales van en los metadatos del esquema.
+    """
+
+    def __init__(self, path, ch_names, sfreq, dtypes=None):
+        pa, pq = import_pyarrow()
+        self.pa = pa
+        self.path = path
+        self.dtypes = dtypes or [SAMPLE_DTYPE] * len(ch_names)
+        metadata = json.dumps({'sfreq': sfreq, 'channels': list(ch_names), 'created': time.time()})
+        self.schema = pa.schema(
+            [pa.field('Timestamp', pa.float64())]
+            + [pa.field(ch, pa.from_numpy_dtype(np.dtype(dt))) for ch, dt in zip(ch_names, self.dtypes)],
+            metadata={PARQUET_METADATA_KEY: metadata.encode('utf-8')},
+        )
+        self.writer = pq.ParquetWriter(path, self.schema, compression=PARQUET_COMPRESSION)
+
+    def write(self, timestamps, values):
+        columns = [self.pa.array(timestamps)] + [
+            self.pa.array(values[i].astype(dt, copy=False)) for i, dt in enumerate(self.dtypes)
+        ]
+        self.writer.write_table(self.pa.Table.from_arrays(columns, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+def open_writer(output_path, ch_names, sfreq, dtypes=None):
+    """
+    Escritor por bloques según la extensión de la salida (.ndr, .parquet; cualquier otra, CSV).
+    :param dtypes: Tipo entero de cada canal en las salidas binarias (por omisión, SAMPLE_DTYPE).
+    """
+    path = output_path.lower()
+    if path.endswith(RECORDING_EXT):
+        return NDRBlockWriter(output_path, ch_names, sfreq, dtypes)
+    if path.endswith(PARQUET_EXT):
+        return ParquetBlockWriter(output_path, ch_names, sfreq, dtypes)
+    return CSVBlockWriter(output_path, ch_names, sfreq, dtypes)
+
+
+def convert_set_to_csv(input_path, output_path=None):
+    """
+    Convierte un archivo EEGLAB .set a CSV (o .ndr o .parquet) compatible con NEURODAC.
+
+    Parámetros:
+        input_path (str): Ruta al archivo .set
+        output_path (str): Ruta de salida (.csv, .ndr o .parquet). Si es None, se genera un CSV automáticamente.
+
+    Retorna:
+        str: Ruta del archivo generado.
+    """
+    if not os.path.exists(input_path):
+        raise FileNotFoundError(f"No se encontró el archivo: {input_path}")
+
+    if not input_path.lower().endswith('.set'):
+        raise ValueError("El archivo debe tener extensión .set")
+
+    # Generar nombre de salida si no se especificó
+    if output_path is None:
+        base = os.path.splitext(os.path.basename(input_path))[0]
+        output_path = os.path.join(os.path.dirname(input_path), f"{base}.csv")
+
+    print(f"Leyendo: {input_path}")
+    read_block, ch_names, sfreq, n_samples = open_set(input_path)
+    if n_samples <= 0:
+        raise ValueError("El archivo no contiene muestras.")
+
+    # MNE multiplica los valores del archivo por 1e-6 al leerlos, así que al
+    # multiplicar por 1e6 la salida son los valores guardados en el .set tanto si
+    # estaban en Volts como en µV; no hace falta volver a leerlo con scipy.io.loadmat.
+    scale = 1e6
+
+    # Archivo temporal junto a la salida: la señal en µV (float32) se lee de ahí
+    # al escribir, así que el .set/.fdt se lee del disco una sola vez
+    fd, staging_path = tempfile.mkstemp(suffix='.f32', dir=os.path.dirname(os.path.abspath(output_path)))
+    os.close(fd)
+    staged = np.memmap(staging_path, dtype=np.float32, mode='w+', shape=(len(ch_names), n_samples))
+    try:
+        # --- Lectura: escalar a µV y acumular media (offset DC) y rango de cada canal ---
+        means, lows, highs = stage_blocks(read_block, n_samples, staged, scale)
+        if stored_in_microvolts(means):
+            print(f"  Datos leídos tal como están en el .set (ya en µV)")
+        else:
+            print(f"  Datos convertidos de Volts a µV")
+
+        # --- Offset DC (media de cada canal en µV) ---
+        offsets = (means * scale)[:, np.newaxis]
+        print(f"  Offset DC removido (media restada por canal)")
+        dtypes = channel_dtypes((lows - means) * scale, (highs - means) * scale)
+
+        # --- Escritura: restar offset, redondear y escribir por bloques ---
+        # Usar tiempo actual como base (similar al formato del CSV original)
+        base_timestamp = time.time()
+        writer = open_writer(output_path, ch_names, sfreq, dtypes)
+        try:
+            for start in range(0, n_samples, CHUNK_SAMPLES):
+                block = staged[:, start:start + CHUNK_SAMPLES].astype(np.float64)
+                block -= offsets
+                # Redondear los valores de señal a enteros (como en el CSV original)
+                values = np.rint(block, out=block).astype(SAMPLE_DTYPE)
+                timestamps = base_timestamp + np.arange(start, start + block.shape[1]) / sfreq
+                writer.write(timestamps, values)
+        finally:
+            writer.close()
+    finally:
+        del staged
+        os.remove(staging_path)
+
+    print(f"\nArchivo generado: {output_path}")
+    print(f"  Filas: {n_samples}")
+    print(f"  Columnas: {(['Timestamp'] + list(ch_names))[:5]}... ({len(ch_names) + 1} total)")
     print(f"  Tamaño: {os.path.getsize(output_path) / (1024*1024):.1f} MB")
-    
+
     return output_path
 
 
-def main():
-    if len(sys.argv) < 2:
-        print("Uso: python set_to_csv.py archivo.set [salida.csv]")
-        print("  Si no se especifica salida, se genera con el mismo nombre del .set")
-        sys.exit(1)
-    
-    input_path = sys.argv[1]
-    output_path = sys.argv[2] if len(sys.argv) > 2 else None
-    
+# =============================================================
+# Conversión por lotes
+# =============================================================
+def file_signature(path):
+    """Tamaño y fecha de modificación de un archivo (None si no existe)."""
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime': stat.st_mtime}
+
+
+def source_signature(input_path):
+    """Firma de un .set y, si existe, de su .fdt (los datos pueden estar en cualquiera)."""
+    return {
+        'set': file_signature(input_path),
+        'fdt': file_signature(os.path.splitext(input_path)[0] + '.fdt'),
+    }
+
+
+def load_manifest(directory):
+    """Manifiesto de un directorio de salida: {nombre de salida: firmas}."""
+    path = os.path.join(directory, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path) as fh:
+            return json.load(fh)
+    except (OSError, ValueError) as e:
+        print(f"Manifiesto inválido en {path}, se ignora: {e}")
+        return {}
+
+
+def save_manifest(directory, manifest):
+    path = os.path.join(directory, MANIFEST_FILE)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as fh:
+        json.dump(manifest, fh, indent=1)
+    os.replace(tmp_path, path)
+
+
+def is_up_to_date(manifest, input_path, output_path):
+    """Indica si `output_path` ya se generó a partir de la versión actual de `input_path`."""
+    entry = manifest.get(os.path.basename(output_path))
+    return (
+        entry is not None
+        and entry.get('source') == source_signature(input_path)
+        and entry.get('output') == file_signature(output_path)
+    )
+
+
+def expand_inputs(entries, recursive=False):
+    """
+    Archivos .set a convertir.
+    :param entries: Lista de archivos, directorios o patrones glob.
+    :param recursive: Buscar también en subdirectorios de los directorios dados.
+    :return: Lista ordenada y sin repetidos de rutas a .set.
+    """
+    found = []
+    for entry in entries:
+        if os.path.isdir(entry):
+            pattern = os.path.join(entry, '**', '*.set') if recursive else os.path.join(entry, '*.set')
+            found.extend(glob.glob(pattern, recursive=recursive))
+        elif glob.has_magic(entry):
+            found.extend(path for path in glob.glob(entry, recursive=True) if path.lower().endswith('.set'))
+        else:
+            found.append(entry)
+    return sorted(set(os.path.abspath(path) for path in found))
+
+
+def output_path_for(input_path, output_dir=None, output_format='csv'):
+    """Ruta de salida de un .set: mismo nombre, en `output_dir` o junto al original."""
+    base = os.path.splitext(os.path.basename(input_path))[0]
+    return os.path.join(output_dir or os.path.dirname(input_path), f"{base}.{output_format}")
+
+
+def convert_job(input_path, output_path):
+    """
+    Convertir un archivo en un proceso del pool sin mezclar su salida con la de los demás.
+    :return: Tupla (input_path, output_path, segundos, error o None).
+    """
+    start = time.perf_counter()
     try:
-        result = convert_set_to_csv(input_path, output_path)
-        print(f"\nConversión exitosa.")
+        with contextlib.redirect_stdout(io.StringIO()):
+            convert_set_to_csv(input_path, output_path)
+        error = None
     except Exception as e:
-        print(f"\nError: {e}")
+        error = f"{type(e).__name__}: {e}"
+    return input_path, output_path, time.perf_counter() - start, error
+
+
+def convert_batch(input_paths, output_dir=None, output_format='csv', jobs=None, force=False):
+    """
+    Convertir varios .set en paralelo, omitiendo los que ya están al día.
+    :param input_paths: Lista de rutas a .set.
+    :param output_dir: Directorio de salida (None: junto a cada .set).
+    :param output_format: 'csv', 'ndr' o 'parquet'.
+    :param jobs: Número de procesos (None: uno por núcleo).
+    :param force: Convertir aunque la salida esté al día.
+    :return: Diccionario con listas 'converted', 'skipped' y 'failed'.
+    """
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    manifests = {}  # directorio de salida -> manifiesto
+    pending = []
+    summary = {'converted': [], 'skipped': [], 'failed': []}
+
+    for input_path in input_paths:
+        output_path = output_path_for(input_path, output_dir, output_format)
+        directory = os.path.dirname(output_path)
+        manifest = manifests.setdefault(directory, load_manifest(directory))
+        if not force and is_up_to_date(manifest, input_path, output_path):
+            summary['skipped'].append(input_path)
+        else:
+            pending.append((input_path, output_path))
+
+    total = len(input_paths)
+    print(f"{total} archivos .set · {len(summary['skipped'])} al día · {len(pending)} por convertir")
+    if not pending:
+        return summary
+
+    start = time.perf_counter()
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(pending)))
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(convert_job, input_path, output_path) for input_path, output_path in pending]
+        for done, future in enumerate(as_completed(futures), start=1):
+            input_path, output_path, elapsed, error = future.result()
+            name = os.path.basename(input_path)
+            if error:
+                summary['failed'].append(input_path)
+                print(f"[{done}/{len(pending)}] {name}: error ({error})")
+                continue
+            summary['converted'].append(input_path)
+            directory = os.path.dirname(output_path)
+            manifests[directory][os.path.basename(output_path)] = {
+                'source': source_signature(input_path),
+                'output': file_signature(output_path),
+            }
+            # Guardar tras cada archivo: si se interrumpe el lote, lo hecho se conserva
+            save_manifest(directory, manifests[directory])
+            print(f"[{done}/{len(pending)}] {name}: {elapsed:.1f} s")
+
+    print(
+        f"\nConvertidos: {len(summary['converted'])} · Al día: {len(summary['skipped'])} · "
+        f"Errores: {len(summary['failed'])} · Tiempo: {time.perf_counter() - start:.1f} s ({jobs} procesos)"
+    )
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convertidor de archivos EEGLAB (.set) a CSV, .ndr o .parquet para NEURODAC.")
+    parser.add_argument('inputs', nargs='+',
+                        help="Archivo .set (opcionalmente seguido de la salida), directorios o patrones glob.")
+    parser.add_argument('-o', '--output-dir', help="Directorio de salida (por omisión, junto a cada .set).")
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default='csv', help="Formato de salida en lotes.")
+    parser.add_argument('-j', '--jobs', type=int, help="Procesos en paralelo (por omisión, uno por núcleo).")
+    parser.add_argument('-r', '--recursive', action='store_true', help="Buscar .set en subdirectorios.")
+    parser.add_argument('--force', action='store_true', help="Convertir aunque la salida esté al día.")
+    args = parser.parse_args()
+
+    # Uso de un solo archivo: python set_to_csv.py archivo.set [salida.csv]
+    single = args.inputs[0].lower().endswith('.set') and os.path.isfile(args.inputs[0]) and (
+        len(args.inputs) == 1 and not args.output_dir
+        or len(args.inputs) == 2 and args.inputs[1].lower().endswith(('.csv', RECORDING_EXT, PARQUET_EXT))
+    )
+    if single:
+        output_path = args.inputs[1] if len(args.inputs) > 1 else None
+        if output_path is None and args.format != 'csv':
+            output_path = output_path_for(args.inputs[0], output_format=args.format)
+        try:
+            convert_set_to_csv(args.inputs[0], output_path)
+            print(f"\nConversión exitosa.")
+        except Exception as e:
+            print(f"\nError: {e}")
+            sys.exit(1)
+        return
+
+    input_paths = expand_inputs(args.inputs, args.recursive)
+    if not input_paths:
+        print("No se encontraron archivos .set.")
+        sys.exit(1)
+    summary = convert_batch(input_paths, args.output_dir, args.format, args.jobs, args.force)
+    if summary['failed']:
         sys.exit(1)
 
 
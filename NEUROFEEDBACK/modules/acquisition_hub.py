@@ -0,0 +1,171 @@
+import threading
+
+from modules.neurosky_data_collector import NeuroSkyDataCollector, validate_signal_type, WAVE_SIGNALS
+
+# Señales que decodifica el hub de cada diadema (todas las que reporta el dispositivo)
+HUB_SIGNALS = ['raw', 'attention', 'meditation', 'blink'] + list(WAVE_SIGNALS)
+
+
+class Subscription:
+    """
+    Lector de una señal de un hub. Cada suscripción tiene su propio cursor sobre el
+    búfer circular de la señal, así que varias páginas pueden leer la misma diadema
+    a su ritmo sin quitarse muestras entre sí.
+    """
+
+    def __init__(self, hub, signal_type):
+        """
+        :param hub: AcquisitionHub que decodifica la diadema.
+        :param signal_type: Tipo de señal que se lee.
+        """
+        self.hub = hub
+        self.signal_type = signal_type
+        self.buffer = hub.collector.buffers[signal_type]
+        self.cursor = self.buffer.head  # Sólo muestras que lleguen después de suscribirse
+        self.closed = False
+
+    @property
+    def port(self):
+        return self.hub.port
+
+    @property
+    def running(self):
+        """Indica si la suscripción sigue abierta y la diadema sigue enviando datos."""
+        return not self.closed and self.hub.running
+
+    def read(self, max_samples=None):
+        """
+        Muestras nuevas desde la lectura anterior.
+        :param max_samples: Máximo de muestras a regresar (las más recientes).
+        :return: Tupla (timestamps, values) de arreglos de NumPy (vacíos si no hay nuevas).
+        """
+        timestamps, values, self.cursor = self.buffer.read_since(self.cursor, max_samples)
+        return timestamps, values
+
+    def close(self):
+        """Cancelar la suscripción; el hub se detiene al cerrarse la última."""
+        if not self.closed:
+            self.closed = True
+            self.hub.unsubscribe(self)
+
+
+class AcquisitionHub:
+    """
+    Una conexión por diadema compartida por todas las páginas.
+
+    El hub abre el puerto una sola vez con un NeuroSkyDataCollector en modo 'event'
+    que guarda todas las señales (HUB_SIGNALS) en sus búferes circulares; cada
+    muestra se decodifica una vez y la leen todas las suscripciones. La conexión se
+    cierra cuando se cancela la última suscripción.
+    """
+
+    def __init__(self, port):
+        """
+        :param port: Puerto serial de la diadema (o 'sim...' para la simulada).
+        """
+        self.port = port
+        self.collector = NeuroSkyDataCollector(
+            port=port, signal_type=HUB_SIGNALS, save_to_csv=False, capture_mode='event'
+        )
+        self.subscriptions = []
+        self.lock = threading.Lock()
+        self.stopped = False
+
+    def start(self):
+        """Conectar a la diadema y empezar a decodificar. Lanza ConnectionError si no es posible."""
+        self.collector.connect()
+        self.collector.collect_data()
+
+    @property
+    def running(self):
+        """Indica si la diadema sigue conectada y el hilo de lectura sigue vivo."""
+        interface = self.collector.interface
+        listener = interface.listener if interface else None
+        return not self.stopped and self.collector.running and listener is not None and listener.is_alive()
+
+    def subscribe(self, signal_type):
+        """
+        Crear un lector de una señal.
+        :param signal_type: Tipo de señal ('raw', 'attention', ...).
+        :return: Subscription.
+        :raises ValueError: Si el tipo de señal no es válido.
+        """
+        validate_signal_type(signal_type)
+        subscription = Subscription(self, signal_type)
+        with self.lock:
+            self.subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Retirar una suscripción; si era la última, cerrar la conexión."""
+        with self.lock:
+            if subscription in self.subscriptions:
+                self.subscriptions.remove(subscription)
+            idle = not self.subscriptions
+        if idle:
+            release_hub(self)
+
+    def stop(self):
+        """Cerrar la conexión con la diadema (una sola vez)."""
+        with self.lock:
+            if self.stopped:
+                return
+            self.stopped = True
+        if self.collector.interface:
+            self.collector.stop()
+
+
+# =============================================================
+# Hubs abiertos (uno por puerto)
+# =============================================================
+_hubs = {}
+_hubs_lock = threading.RLock()
+
+
+def get_hub(port):
+    """
+    Obtener el hub de un puerto, conectándolo si no existe o si su conexión se perdió.
+    :param port: Puerto serial de la diadema.
+    :return: AcquisitionHub.
+    :raises ValueError: Si no se especifica el puerto.
+    """
+    port = (port or '').strip()
+    if not port:
+        raise ValueError("El puerto serial no ha sido especificado.")
+    with _hubs_lock:
+        hub = _hubs.get(port)
+        if hub is not None and hub.running:
+            return hub
+        if hub is not None:
+            print(f"Conexión perdida en {port}; se vuelve a conectar.")
+            hub.stop()
+            del _hubs[port]
+        hub = AcquisitionHub(port)
+        hub.start()
+        _hubs[port] = hub
+        return hub
+
+
+def release_hub(hub):
+    """Cerrar un hub sin suscripciones y retirarlo del registro."""
+    with _hubs_lock:
+        with hub.lock:
+            if hub.subscriptions:
+                return  # Alguien se suscribió mientras tanto
+        if _hubs.get(hub.port) is hub:
+            del _hubs[hub.port]
+    hub.stop()
+
+
+def subscribe(port, signal_type):
+    """
+    Suscribirse a una señal de la diadema conectada en `port`, abriendo la conexión
+    si ninguna otra página la tiene abierta.
+    :param port: Puerto serial de la diadema.
+    :param signal_type: Tipo de señal.
+    :return: Subscription.
+    """
+    validate_signal_type(signal_type)
+    # El candado del registro evita que el hub se cierre entre obtenerlo y suscribirse
+    with _hubs_lock:
+        return get_hub(port).subscribe(signal_type)
@@ -0,0 +1,83 @@
+import threading
+from collections import OrderedDict
+
+import mne
+import numpy as np
+
+FILTER_CACHE_BYTES = 256 * 1024 * 1024  # Memoria máxima para señales filtradas
+
+
+class BandFilterCache:
+    """
+    Caché de señales filtradas por banda de frecuencia.
+
+    Cada canal se filtra completo una sola vez por banda, la primera vez que se
+    pide, y después sólo se sirven rebanadas del resultado. Cuando el total de
+    bytes supera `max_bytes` se descartan los canales filtrados usados hace más
+    tiempo (LRU).
+    """
+
+    def __init__(self, data, sfreq, bands, max_bytes=FILTER_CACHE_BYTES, on_grow=None):
+        """
+        :param data: Arreglo (canales x muestras) con la señal sin filtrar.
+        :param sfreq: Frecuencia de muestreo en Hz.
+        :param bands: Diccionario {banda: (fmin, fmax)}.
+        :param max_bytes: Memoria máxima que pueden ocupar las señales filtradas.
+        :param on_grow: Función opcional sin argumentos que se llama (fuera del candado)
+                        cada vez que se agrega un canal filtrado, p. ej. para que el
+                        caché de grabaciones respete su propio límite de memoria.
+        """
+        self.data = data
+        self.sfreq = sfreq
+        self.bands = bands
+        self.max_bytes = max_bytes
+        self.on_grow = on_grow
+        self.entries = OrderedDict()  # (banda, canal) -> arreglo filtrado
+        self.nbytes = 0
+        self.lock = threading.Lock()
+
+    def get(self, band, ch_idx):
+        """
+        Obtener la señal completa de un canal filtrada en una banda.
+        :param band: Nombre de la banda; si no está en `bands` se regresa la señal sin filtrar.
+        :param ch_idx: Índice del canal.
+        :return: Arreglo 1D con todas las muestras del canal.
+        """
+        if band not in self.bands:
+            return self.data[ch_idx]
+
+        key = (band, ch_idx)
+        with self.lock:
+            filtered = self.entries.get(key)
+            if filtered is not None:
+                self.entries.move_to_end(key)
+                return filtered
+
+        # Filtrar fuera del candado para no bloquear otras peticiones
+        fmin, fmax = self.bands[band]
+        filtered = mne.filter.filter_data(
+            np.asarray(self.data[ch_idx], dtype=np.float64), self.sfreq, fmin, fmax,
+            fir_design='firwin', verbose='ERROR'
+        ).astype(np.float32)
+
+        with self.lock:
+            grew = key not in self.entries
+            if grew:
+                self.entries[key] = filtered
+                self.nbytes += filtered.nbytes
+                self.evict()
+        if grew and self.on_grow is not None:
+            self.on_grow()
+        return filtered
+
+    def evict(self):
+        """Descarta los canales filtrados menos usados hasta respetar max_bytes."""
+        while self.nbytes > self.max_bytes and len(self.entries) > 1:
+            _, old = self.entries.popitem(last=False)
+            self.nbytes -= old.nbytes
+
+    def clear(self):
+        """Descartar todas las señales filtradas."""
+        with self.lock:
+            self.entries.clear()
+            self.nbytes = 0
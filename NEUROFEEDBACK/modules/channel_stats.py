@@ -0,0 +1,165 @@
+import threading
+
+import numpy as np
+
+PERCENTILES = (1, 5, 25, 50, 75, 95, 99)
+STATS_FIELDS = ('min', 'max', 'mean', 'std')
+ROBUST_PADDING = 1.5  # Margen sobre los percentiles 1–99 en la escala fija
+STATS_BLOCK_SECONDS = 1  # Duración de cada bloque resumido
+
+
+def block_stats(x, block_size):
+    """
+    Estadísticas por bloque de un canal.
+    :param x: Arreglo 1D con la señal completa.
+    :param block_size: Muestras por bloque (el último bloque puede ser incompleto).
+    :return: Diccionario con 'min', 'max', 'mean', 'std' (bloques,) y 'pct' (percentiles x bloques),
+             y los resúmenes del canal completo con prefijo 'channel_'.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    n_full = len(x) // block_size
+    blocks = [x[:n_full * block_size].reshape(n_full, block_size)]
+    if len(x) % block_size:
+        blocks.append(x[n_full * block_size:][np.newaxis, :])
+
+    stats = {field: [] for field in STATS_FIELDS + ('pct',)}
+    for b in blocks:
+        stats['min'].append(b.min(axis=1))
+        stats['max'].append(b.max(axis=1))
+        stats['mean'].append(b.mean(axis=1))
+        stats['std'].append(b.std(axis=1))
+        stats['pct'].append(np.percentile(b, PERCENTILES, axis=1))
+    stats = {field: np.concatenate(values, axis=-1).astype(np.float32) for field, values in stats.items()}
+
+    stats['channel_min'] = np.float32(x.min()) if len(x) else np.float32(0)
+    stats['channel_max'] = np.float32(x.max()) if len(x) else np.float32(0)
+    stats['channel_mean'] = np.float32(x.mean()) if len(x) else np.float32(0)
+    stats['channel_std'] = np.float32(x.std()) if len(x) else np.float32(0)
+    stats['channel_pct'] = (np.percentile(x, PERCENTILES) if len(x) else np.zeros(len(PERCENTILES))).astype(np.float32)
+    return stats
+
+
+class ChannelStats:
+    """
+    Índice de estadísticas por canal y por bloque de una señal (mín, máx, media,
+    desviación estándar y percentiles), para obtener rangos de ejes sin recorrer
+    las muestras de la ventana que se grafica.
+
+    Cada canal se resume la primera vez que se pide; después el rango de
+    cualquier ventana sale de los bloques que la cubren. Los bloques son
+    de `block_size` muestras, así que el rango puede ser un poco más amplio que
+    el exacto de la ventana.
+    """
+
+    def __init__(self, get_channel, n_channels, block_size, on_complete=None):
+        """
+        :param get_channel: Función que recibe un índice de canal y regresa la señal completa.
+        :param n_channels: Número de canales.
+        :param block_size: Muestras por bloque.
+        :param on_complete: Función opcional que recibe este ChannelStats y se llama una vez,
+                            cuando se termina de calcular el último canal (p. ej. para guardarlo).
+        """
+        self.get_channel = get_channel
+        self.n_channels = n_channels
+        self.block_size = block_size
+        self.on_complete = on_complete
+        self.channels = {}  # índice de canal -> diccionario de block_stats()
+        self.lock = threading.Lock()
+
+    @property
+    def complete(self):
+        """Indica si todos los canales están calculados."""
+        return len(self.channels) == self.n_channels
+
+    def channel(self, ch_idx):
+        """Estadísticas de un canal (se calculan la primera vez)."""
+        stats = self.channels.get(ch_idx)
+        if stats is None:
+            stats = block_stats(self.get_channel(ch_idx), self.block_size)
+            with self.lock:
+                completed = ch_idx not in self.channels and len(self.channels) == self.n_channels - 1
+                stats = self.channels.setdefault(ch_idx, stats)
+            if completed and self.on_complete is not None:
+                self.on_complete(self)
+        return stats
+
+    def window(self, ch_idx, start_idx, end_idx):
+        """
+        Mínimo y máximo de un canal en una ventana, a partir de los bloques que la cubren.
+        :return: Tupla (mín, máx), o None si la ventana está vacía.
+        """
+        stats = self.channel(ch_idx)
+        first = start_idx // self.block_size
+        last = min(-(-end_idx // self.block_size), len(stats['min']))
+        if first >= last:
+            return None
+        return float(stats['min'][first:last].min()), float(stats['max'][first:last].max())
+
+    def robust_limit(self, ch_idx):
+        """Amplitud fija de un canal: el mayor de |p1| y |p99| de toda la señal, con margen."""
+        pct = self.channel(ch_idx)['channel_pct']
+        low, high = pct[PERCENTILES.index(1)], pct[PERCENTILES.index(99)]
+        return float(max(abs(low), abs(high))) * ROBUST_PADDING
+
+    def limits(self, picks, start_idx, end_idx, fixed=False):
+        """
+        Amplitud de referencia de cada canal: el máximo absoluto en la ventana o,
+        con escala fija, la amplitud robusta de toda la grabación.
+        :param picks: Lista de índices de canal.
+        :return: Arreglo con una amplitud por canal (NaN si la ventana está vacía).
+        """
+        out = np.full(len(picks), np.nan)
+        for i, ch_idx in enumerate(picks):
+            if fixed:
+                out[i] = self.robust_limit(ch_idx)
+                continue
+            lim = self.window(ch_idx, start_idx, end_idx)
+            if lim is not None:
+                out[i] = max(abs(lim[0]), abs(lim[1]))
+        return out
+
+    def yrange(self, picks, start_idx, end_idx, fixed=False, padding=1.1):
+        """
+        Rango Y simétrico centrado en 0 para uno o varios canales.
+        :param picks: Lista de índices de canal.
+        :param fixed: Si es True, usa la escala robusta de toda la grabación (no cambia entre ventanas).
+        :param padding: Margen sobre el máximo absoluto de la ventana.
+        """
+        limits = self.limits(picks, start_idx, end_idx, fixed)
+        if np.isnan(limits).all():
+            return [-500, 500]
+        max_abs = float(np.nanmax(limits)) * (1 if fixed else padding)
+        if max_abs == 0:
+            return [-100, 100]
+        return [-max_abs, max_abs]
+
+    # --- Persistencia (sólo cuando todos los canales están calculados) ---
+    def save(self, path):
+        """
+        Guardar las estadísticas de todos los canales en un .npz.
+        :raises ValueError: Si falta calcular algún canal (no se calculan aquí).
+        """
+        if not self.complete:
+            raise ValueError("Faltan canales por calcular; las estadísticas no se guardan.")
+        arrays = {'block_size': np.int64(self.block_size)}
+        for key in self.channels[0] if self.n_channels else ():
+            for ch_idx in range(self.n_channels):
+                arrays[f'{key}_{ch_idx}'] = self.channels[ch_idx][key]
+        np.savez(path, **arrays)
+
+    def load(self, path):
+        """
+        Cargar estadísticas guardadas con save().
+        :return: True si el archivo corresponde a este número de canales y tamaño de bloque.
+        """
+        with np.load(path) as npz:
+            if int(npz['block_size']) != self.block_size:
+                return False
+            keys = {name.rsplit('_', 1)[0] for name in npz.files if name != 'block_size'}
+            channels = {}
+            for ch_idx in range(self.n_channels):
+                if f'min_{ch_idx}' not in npz.files:
+                    return False
+                channels[ch_idx] = {key: npz[f'{key}_{ch_idx}'] for key in keys}
+        self.channels = channels
+        return True
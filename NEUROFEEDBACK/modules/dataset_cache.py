@@ -0,0 +1,149 @@
+import os
+import threading
+from collections import OrderedDict
+
+from modules.band_cache import BandFilterCache, FILTER_CACHE_BYTES
+from modules.channel_stats import ChannelStats, STATS_BLOCK_SECONDS
+from modules.recording import RECORDING_EXT, PARQUET_EXT
+from modules.recording_store import RecordingStore
+
+DATASET_CACHE_ITEMS = 4  # Grabaciones abiertas a la vez
+DATASET_CACHE_BYTES = 1024 * 1024 * 1024  # Memoria máxima de las señales filtradas
+RECORDING_EXTENSIONS = ('.csv', RECORDING_EXT, PARQUET_EXT)
+
+
+def find_recordings(directory):
+    """
+    Listar las grabaciones (CSV, .ndr o .parquet) de un directorio.
+    :param directory: Directorio de datos.
+    :return: Lista ordenada de nombres de archivo.
+    """
+    if not os.path.isdir(directory):
+        return []
+    return sorted(
+        name for name in os.listdir(directory)
+        if name.lower().endswith(RECORDING_EXTENSIONS) and os.path.isfile(os.path.join(directory, name))
+    )
+
+
+class LoadedRecording:
+    """Grabación abierta junto con su caché de señales filtradas."""
+
+    def __init__(self, path, bands, sfreq, max_bytes=FILTER_CACHE_BYTES, on_grow=None):
+        """
+        :param path: Ruta de la grabación.
+        :param bands: Diccionario {banda: (fmin, fmax)} para el filtrado.
+        :param sfreq: Frecuencia de muestreo si el archivo no la indica.
+        :param max_bytes: Memoria máxima de las señales filtradas de esta grabación.
+        :param on_grow: Función que se llama cada vez que crecen las señales filtradas.
+        """
+        self.path = path
+        self.store = RecordingStore(path, sfreq=sfreq)
+        self.filters = BandFilterCache(
+            self.store.data, self.store.sfreq, bands, max_bytes=max_bytes, on_grow=on_grow
+        )
+        self.band_stats = {}  # banda -> ChannelStats de los canales filtrados
+
+    def stats(self, band='none'):
+        """
+        Estadísticas por canal y por bloque de la señal sin filtrar o filtrada en una banda.
+        Las de cada banda se calculan, canal por canal, la primera vez que se piden.
+        """
+        if band not in self.filters.bands:
+            return self.store.stats
+        stats = self.band_stats.get(band)
+        if stats is None:
+            stats = self.band_stats.setdefault(band, ChannelStats(
+                lambda ch_idx: self.filters.get(band, ch_idx),
+                len(self.store.channels), int(self.store.sfreq * STATS_BLOCK_SECONDS)
+            ))
+        return stats
+
+    @property
+    def nbytes(self):
+        """
+        Bytes que ocupa en memoria: sólo las señales filtradas. Los datos están
+        mapeados desde el archivo del caché y el sistema puede liberar sus páginas.
+        """
+        return self.filters.nbytes
+
+
+class DatasetCache:
+    """
+    Caché de las grabaciones abiertas en la página de visualización.
+
+    Conserva las `max_items` grabaciones usadas más recientemente, junto con sus
+    señales filtradas, y descarta las usadas hace más tiempo (LRU) cuando se
+    excede ese número o `max_bytes`. La grabación más reciente nunca se descarta;
+    sus señales filtradas se limitan a `max_bytes` con su propio LRU. El límite
+    se revisa al abrir una grabación y cada vez que alguna filtra un canal nuevo.
+
+    Cada grabación se abre (y, si hace falta, se convierte) una sola vez aunque
+    varias peticiones la pidan al mismo tiempo: las demás esperan a la primera.
+    """
+
+    def __init__(self, directory, bands, sfreq=512, max_items=DATASET_CACHE_ITEMS, max_bytes=DATASET_CACHE_BYTES):
+        """
+        :param directory: Directorio con las grabaciones.
+        :param bands: Diccionario {banda: (fmin, fmax)} para el filtrado.
+        :param sfreq: Frecuencia de muestreo si el archivo no la indica.
+        :param max_items: Número máximo de grabaciones abiertas.
+        :param max_bytes: Memoria máxima de las señales filtradas de todas las grabaciones abiertas.
+        """
+        self.directory = directory
+        self.bands = bands
+        self.sfreq = sfreq
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # nombre de archivo -> LoadedRecording
+        self.loading = {}  # nombre de archivo -> candado de la apertura en curso
+        self.lock = threading.Lock()
+
+    def get(self, name):
+        """
+        Obtener una grabación por nombre de archivo, abriéndola si no está en el caché.
+        :param name: Nombre del archivo dentro de `directory`.
+        :return: LoadedRecording.
+        :raises FileNotFoundError: Si el archivo no existe en el directorio de datos.
+        """
+        # Sólo nombres de archivo: no se permite salir del directorio de datos
+        name = os.path.basename(name or '')
+        with self.lock:
+            recording = self.entries.get(name)
+            if recording is not None:
+                self.entries.move_to_end(name)
+                return recording
+            loading = self.loading.setdefault(name, threading.Lock())
+
+        # Una sola apertura por nombre; quien llegue mientras tanto espera y la reutiliza
+        with loading:
+            with self.lock:
+                recording = self.entries.get(name)
+                if recording is not None:
+                    self.entries.move_to_end(name)
+                    return recording
+
+            path = os.path.join(self.directory, name)
+            if not os.path.isfile(path):
+                raise FileNotFoundError(f"No se encontró la grabación: {path}")
+            recording = LoadedRecording(
+                path, self.bands, self.sfreq,
+                max_bytes=min(FILTER_CACHE_BYTES, self.max_bytes), on_grow=self.evict
+            )
+
+            with self.lock:
+                self.entries[name] = recording
+                self.entries.move_to_end(name)
+                self.loading.pop(name, None)
+        self.evict()
+        return recording
+
+    def evict(self):
+        """Descarta las grabaciones menos usadas hasta respetar max_items y max_bytes."""
+        with self.lock:
+            while len(self.entries) > 1 and (
+                len(self.entries) > self.max_items
+                or sum(rec.nbytes for rec in self.entries.values()) > self.max_bytes
+            ):
+                _, old = self.entries.popitem(last=False)
+                old.filters.clear()
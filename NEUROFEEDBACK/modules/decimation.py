@@ -0,0 +1,102 @@
+import numpy as np
+
+DECIMATION_MODES = ('minmax', 'lttb', 'full')
+
+
+def minmax_decimate(x, y, n_out):
+    """
+    Reducir una o varias series a una envolvente mín/máx de ~n_out puntos.
+    Cada bloque de muestras se representa con su mínimo y su máximo (en orden
+    temporal), así que los picos se conservan aunque se descarten muestras.
+    :param x: Arreglo 1D con los tiempos (compartido por todas las series).
+    :param y: Arreglo 1D, o 2D (series x muestras).
+    :param n_out: Número aproximado de puntos por serie.
+    :return: Tupla (x, y) decimada; x tiene la misma forma que y.
+    """
+    y = np.asarray(y)
+    n = y.shape[-1]
+    if n <= n_out or n_out < 4:
+        return np.broadcast_to(x, y.shape), y
+
+    size = int(np.ceil(n / (n_out // 2)))
+    n_buckets = int(np.ceil(n / size))
+    pad = n_buckets * size - n
+    if pad:
+        # Rellenar con la última muestra para que todos los bloques midan lo mismo
+        y = np.concatenate([y, np.repeat(y[..., -1:], pad, axis=-1)], axis=-1)
+    blocks = y.reshape(y.shape[:-1] + (n_buckets, size))
+    imin = blocks.argmin(axis=-1)
+    imax = blocks.argmax(axis=-1)
+    base = np.arange(n_buckets) * size
+
+    idx = np.empty(imin.shape[:-1] + (2 * n_buckets,), dtype=np.intp)
+    idx[..., 0::2] = np.minimum(imin, imax) + base
+    idx[..., 1::2] = np.maximum(imin, imax) + base
+    np.minimum(idx, n - 1, out=idx)
+    return x[idx], np.take_along_axis(y, idx, axis=-1)
+
+
+def lttb(x, y, n_out):
+    """
+    Reducir una o varias series con Largest-Triangle-Three-Buckets.
+    Se elige en cada bloque el punto que forma el triángulo de mayor área con el
+    punto elegido antes y con el promedio del bloque siguiente. El recorrido por
+    bloques es secuencial, pero cada paso se calcula para todas las series a la vez.
+    :param x: Arreglo 1D con los tiempos (compartido por todas las series).
+    :param y: Arreglo 1D, o 2D (series x muestras).
+    :param n_out: Número de puntos por serie (incluye el primero y el último).
+    :return: Tupla (x, y) decimada; x tiene la misma forma que y.
+    """
+    y = np.asarray(y)
+    squeeze = y.ndim == 1
+    y2 = np.atleast_2d(y)
+    n = y2.shape[-1]
+    if n <= n_out or n_out < 3:
+        return np.broadcast_to(x, y.shape), y
+
+    x = np.asarray(x, dtype=np.float64)
+    rows = np.arange(y2.shape[0])
+    every = (n - 2) / (n_out - 2)
+    idx = np.empty((y2.shape[0], n_out), dtype=np.intp)
+    idx[:, 0] = 0
+    idx[:, -1] = n - 1
+    a = np.zeros(y2.shape[0], dtype=np.intp)
+
+    for i in range(n_out - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_start = end
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y2[:, next_start:next_end].mean(axis=1)
+
+        ax = x[a]
+        ay = y2[rows, a]
+        area = np.abs(
+            (ax - avg_x)[:, None] * (y2[:, start:end] - ay[:, None])
+            - (ax[:, None] - x[start:end]) * (avg_y - ay)[:, None]
+        )
+        a = start + area.argmax(axis=1)
+        idx[:, i + 1] = a
+
+    y_out = np.take_along_axis(y2, idx, axis=1)
+    x_out = x[idx]
+    if squeeze:
+        return x_out[0], y_out[0]
+    return x_out, y_out
+
+
+def decimate(x, y, mode, n_out):
+    """
+    Decimar para graficar según el modo elegido.
+    :param x: Arreglo 1D con los tiempos.
+    :param y: Arreglo 1D, o 2D (series x muestras).
+    :param mode: 'minmax', 'lttb' o 'full' (resolución completa, sin decimar).
+    :param n_out: Número aproximado de puntos por serie.
+    :return: Tupla (x, y); x tiene la misma forma que y.
+    """
+    if mode == 'minmax':
+        return minmax_decimate(x, y, n_out)
+    if mode == 'lttb':
+        return lttb(x, y, n_out)
+    return np.broadcast_to(x, np.shape(y)), y
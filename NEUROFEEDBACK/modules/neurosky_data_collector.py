@@ -1,4 +1,3 @@
-import csv
 import serial
 import time
 import matplotlib.pyplot as plt
@@ -9,34 +8,69 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from modules.neurosky_interface import NeuroSkyInterface
+from modules.ring_buffer import RingBuffer
+from modules.recording import BatchCSVWriter, BatchBinaryWriter, FLUSH_INTERVAL, RECORDING_EXT
 import threading
 
 SAMPLE_FREQ = 512.0
+HISTORY_SECONDS = 60.0
+LATEST_SAMPLES = 512
+ESENSE_FREQ = 1.0  # Frecuencia nominal de eSense y potencias ASIC
+CAPTURE_MODES = ('event', 'polling')
+SAVE_FORMATS = ('csv', 'binary')
+WAVE_SIGNALS = NeuroSkyInterface.WAVE_NAMES
 
 class NeuroSkyDataCollector:
-    def __init__(self, sample_freq=SAMPLE_FREQ, port=None, signal_type='raw', graph=False, csv_file='data.csv', save_to_csv=True):
+    def __init__(self, sample_freq=SAMPLE_FREQ, port=None, signal_type='raw', graph=False, csv_file='data.csv', save_to_csv=True,
+                 capture_mode='event', history_seconds=HISTORY_SECONDS, csv_flush_interval=FLUSH_INTERVAL,
+                 save_format='csv'):
         """
         Inicializa el recolector de datos del NeuroSky.
         :param sample_freq: Frecuencia de muestreo para la recolección de datos.
         :param port: Puerto serial al que está conectado el dispositivo NeuroSky.
-        :param signal_type: Tipo de señal a recolectar ('raw', 'attention', 'meditation', etc.).
+        :param signal_type: Tipo de señal a recolectar ('raw', 'attention', 'meditation', etc.) o lista de
+                            tipos para grabar varias señales de la misma diadema con una sola conexión.
         :param graph: Si es True, se graficarán los datos en tiempo real.
-        :param csv_file: Nombre del archivo CSV donde se guardarán los datos.
-        :param save_to_csv: Si es True, se guardarán los datos en un archivo CSV.
+        :param csv_file: Nombre del archivo donde se guardarán los datos.
+        :param save_to_csv: Si es True, se guardarán los datos en un archivo (CSV o binario, según save_format).
+        :param capture_mode: 'event' registra el recolector en los manejadores de la interfaz y
+                             guarda cada muestra decodificada una sola vez, con su tiempo de llegada;
+                             'polling' consulta el último valor cada 1/sample_freq segundos.
+        :param history_seconds: Segundos de historia que conserva el búfer circular de cada señal,
+                                a la frecuencia con la que se captura (en modo 'event', la nativa:
+                                sample_freq para raw y ~1 Hz para las demás; en 'polling', sample_freq).
+        :param csv_flush_interval: Segundos entre escrituras de bloque al archivo.
+        :param save_format: 'csv' para texto (Timestamp,<Señal>) o 'binary' para el formato
+                            binario .ndr (ver modules/recording.py), que se abre con np.memmap.
         """
+        if capture_mode not in CAPTURE_MODES:
+            raise ValueError(f"Modo de captura inválido: {capture_mode}. Los modos válidos son: {', '.join(CAPTURE_MODES)}")
+        if save_format not in SAVE_FORMATS:
+            raise ValueError(f"Formato de guardado inválido: {save_format}. Los formatos válidos son: {', '.join(SAVE_FORMATS)}")
         self.port = port
-        self.signal_type = signal_type
+        self.signal_types = [signal_type] if isinstance(signal_type, str) else list(signal_type)
+        if not self.signal_types:
+            raise ValueError("Se requiere al menos un tipo de señal.")
+        self.signal_type = self.signal_types[0]  # Señal principal (gráfica e impresión)
+        self.stream_index = {st: i for i, st in enumerate(self.signal_types)}
         self.graph = graph
         self.sample_freq = sample_freq
-        self.raw_data = []
+        self.capture_mode = capture_mode
+        self.buffers = {
+            st: RingBuffer(max(LATEST_SAMPLES, int(history_seconds * self.capture_freq(st))))
+            for st in self.signal_types
+        }
+        self.buffer = self.buffers[self.signal_type]
         self.running = False
         self.interface = None
         self.csv_file = csv_file
         self.save_to_csv = save_to_csv
         self.fig, self.ax, self.line = None, None, None
         self.data_thread = None  
-        self.csv_writer = None  # Variable para manejar el archivo CSV
-        self.csv_file_handle = None  # Manejador del archivo CSV
+        self.csv_writer = None  # Escritor por bloques del archivo (CSV o binario)
+        self.save_format = save_format
+        self.csv_flush_interval = csv_flush_interval
+        self.sample_handlers = []  # (lista de la interfaz, manejador) registrados en modo 'event'
 
     def connect(self):
         """
@@ -61,28 +95,31 @@ class NeuroSkyDataCollector:
             raise ValueError("No se ha establecido conexión con el dispositivo.")
         
         self.running = True
-        self.raw_data = []
+        for buffer in self.buffers.values():
+            buffer.clear()
 
         try:
             # Si se requiere guardar en CSV, abrir el archivo
             if self.save_to_csv:
-                self.csv_file_handle = open(self.csv_file, mode='w', newline='')
-                self.csv_writer = csv.writer(self.csv_file_handle)
-                self.csv_writer.writerow(['Timestamp', self.signal_type.capitalize()])  # Escribir encabezados
+                if self.save_format == 'binary':
+                    self.csv_writer = BatchBinaryWriter(
+                        self.csv_file, self.signal_types, self.sample_freq, self.csv_flush_interval
+                    )
+                else:
+                    self.csv_writer = BatchCSVWriter(
+                        self.csv_file, self.signal_types, self.csv_flush_interval
+                    )
+
+            if self.capture_mode == 'event':
+                self.register_handlers()
+                return
 
             def collect():
                 while self.running:
                     try:
-                        signal_value = self.get_signal_value(self.signal_type)
-                        self.raw_data.append(signal_value)
-
-                        # Guardar en el CSV el valor con el tiempo actual (si se ha habilitado)
-                        if self.save_to_csv:
-                            self.csv_writer.writerow([time.time(), signal_value])
-                            self.csv_file_handle.flush()  # Forzar escritura en disco
-
-                        if len(self.raw_data) > 512:  # Limita los datos a los últimos 512 puntos
-                            self.raw_data.pop(0)
+                        timestamp = time.time()
+                        for signal_type in self.signal_types:
+                            self.store_sample(timestamp, self.get_signal_value(signal_type), signal_type)
                         time.sleep(1.0 / self.sample_freq)
                     except Exception as e:
                         print(f"Error durante la recolección de datos: {e}")
@@ -96,6 +133,110 @@ class NeuroSkyDataCollector:
             print(f"Error al abrir o escribir en el archivo CSV: {e}")
             self.running = False
 
+    def native_freq(self, signal_type):
+        """
+        Frecuencia nativa con la que el dispositivo reporta un tipo de señal.
+        :param signal_type: Tipo de señal.
+        :return: Frecuencia en Hz.
+        """
+        return self.sample_freq if signal_type == 'raw' else ESENSE_FREQ
+
+    def capture_freq(self, signal_type):
+        """
+        Frecuencia con la que llegan al búfer las muestras de un tipo de señal: la nativa
+        en modo 'event'; en modo 'polling' todas las señales se consultan a sample_freq.
+        :param signal_type: Tipo de señal.
+        :return: Frecuencia en Hz.
+        """
+        if self.capture_mode == 'polling':
+            return self.sample_freq
+        return self.native_freq(signal_type)
+
+    def store_sample(self, timestamp, signal_value, signal_type=None):
+        """
+        Guardar una muestra en memoria y, si se ha habilitado, en el archivo.
+        :param timestamp: Tiempo de llegada de la muestra.
+        :param signal_value: Valor de la señal.
+        :param signal_type: Tipo de señal de la muestra (por defecto, la señal principal).
+        """
+        if signal_type is None:
+            signal_type = self.signal_type
+        self.buffers[signal_type].append(timestamp, signal_value)
+
+        # Encolar en el archivo el valor con su tiempo de llegada (si se ha habilitado)
+        if self.csv_writer:
+            self.csv_writer.append(timestamp, signal_value, self.stream_index[signal_type])
+
+    def get_signal_handlers(self, signal_type):
+        """
+        Obtener la lista de manejadores de la interfaz que notifica el tipo de señal.
+        :param signal_type: Tipo de señal a recolectar.
+        :return: Lista de manejadores de NeuroSkyInterface.
+        """
+        if signal_type in WAVE_SIGNALS:
+            return self.interface.waves_handlers
+        handlers_mapping = {
+            'raw': self.interface.raw_value_handlers,
+            'attention': self.interface.attention_handlers,
+            'meditation': self.interface.meditation_handlers,
+            'blink': self.interface.blink_handlers,
+        }
+        if signal_type not in handlers_mapping:
+            raise ValueError(f"Tipo de señal inválido: {signal_type}")
+        return handlers_mapping[signal_type]
+
+    def register_handlers(self):
+        """
+        Registrar el recolector en los manejadores de la interfaz (modo 'event').
+        Se registra un manejador por lista de la interfaz (las bandas ASIC comparten
+        waves_handlers); cada uno se ejecuta en el hilo del listener una vez por
+        muestra decodificada.
+        """
+        groups = {}
+        for signal_type in self.signal_types:
+            handlers = self.get_signal_handlers(signal_type)
+            groups.setdefault(id(handlers), (handlers, []))[1].append(signal_type)
+
+        for handlers, signal_types in groups.values():
+            handler = self.make_handler(signal_types)
+            handlers.append(handler)
+            self.sample_handlers.append((handlers, handler))
+
+    def make_handler(self, signal_types):
+        """
+        Crear el manejador que guarda las muestras de un grupo de señales.
+        :param signal_types: Señales notificadas por la misma lista de manejadores.
+        :return: Función manejador(interface, value).
+        """
+        waves = [st for st in signal_types if st in WAVE_SIGNALS]
+        signal_type = signal_types[0]
+
+        def on_sample(interface, value):
+            if not self.running:
+                return
+            try:
+                timestamp = time.time()
+                if waves:
+                    for wave in waves:
+                        self.store_sample(timestamp, value.get(wave, 0), wave)
+                else:
+                    self.store_sample(timestamp, value, signal_type)
+            except Exception as e:
+                print(f"Error durante la recolección de datos: {e}")
+                self.running = False
+                self.unregister_handlers()
+
+        return on_sample
+
+    def unregister_handlers(self):
+        """
+        Retirar los manejadores registrados por register_handlers().
+        """
+        for handlers, handler in self.sample_handlers:
+            if handler in handlers:
+                handlers.remove(handler)
+        self.sample_handlers = []
+
     def get_signal_value(self, signal_type):
         """
         Obtener el valor del tipo de señal especificado.
@@ -123,12 +264,15 @@ class NeuroSkyDataCollector:
         Detener la recolección de datos.
         """
         self.running = False
+        if self.interface:
+            self.unregister_handlers()
         if self.data_thread:
             self.data_thread.join()  
         if self.interface:
             self.interface.stop()
-        if self.csv_file_handle:
-            self.csv_file_handle.close()  # Cerrar el archivo CSV correctamente
+        if self.csv_writer:
+            csv_writer, self.csv_writer = self.csv_writer, None
+            csv_writer.close()  # Escribir lo pendiente y cerrar el archivo (lanza IOError si falló)
         print("Recolección de datos detenida y archivo CSV cerrado.")
 
     def initialize_plot(self):
@@ -147,15 +291,16 @@ class NeuroSkyDataCollector:
         """
         Actualizar los datos en la gráfica en tiempo real.
         """
-        self.line.set_data(range(len(self.raw_data)), self.raw_data)
-        self.ax.set_xlim(0, len(self.raw_data))
+        data = self.get_latest_data()
+        self.line.set_data(range(len(data)), data)
+        self.ax.set_xlim(0, len(data))
         return self.line,
 
     def animate_plot(self):
         """
         Graficar en tiempo real los datos recolectados.
         """
-        if not self.raw_data:
+        if not len(self.buffer):
             print("No hay datos para graficar.")
             return
 
@@ -168,16 +313,28 @@ class NeuroSkyDataCollector:
         Imprimir los datos recolectados en la consola.
         """
         while self.running:
-            if self.raw_data:
-                print(f"{self.signal_type.capitalize()} Value: {self.raw_data[-1]}")
+            if len(self.buffer):
+                print(f"{self.signal_type.capitalize()} Value: {self.buffer.view(1)[1][0]}")
             time.sleep(1.0 / self.sample_freq)
 
-    def get_latest_data(self):
+    def get_latest_data(self, n=LATEST_SAMPLES, signal_type=None):
         """
         Obtener los datos más recientes recolectados.
-        :return: Lista de valores de señal recolectados.
+        :param n: Número de muestras (None para toda la historia del búfer).
+        :param signal_type: Señal a consultar (por defecto, la señal principal).
+        :return: Copia contigua (arreglo de NumPy) de los valores de señal recolectados.
+        """
+        return self.buffers[signal_type or self.signal_type].snapshot(n)[1]
+
+    def get_latest_view(self, n=LATEST_SAMPLES, signal_type=None):
+        """
+        Obtener las muestras más recientes sin copiarlas.
+        Las vistas se sobrescriben conforme llegan muestras nuevas; ver RingBuffer.view().
+        :param n: Número de muestras (None para toda la historia del búfer).
+        :param signal_type: Señal a consultar (por defecto, la señal principal).
+        :return: Tupla (timestamps, values) de vistas contiguas de NumPy.
         """
-        return self.raw_data
+        return self.buffers[signal_type or self.signal_type].view(n)
 
 def validate_signal_type(signal_type):
     """
@@ -196,20 +353,27 @@ def validate_signal_type(signal_type):
 def main():
     try:
         port = input("Especifica el puerto serial (ej. COM3 o /dev/ttyUSB0): ").strip()
-        signal_type = input("Especifica el tipo de señal (raw, attention, meditation, blink, delta, theta, low-alpha, high-alpha, low-beta, high-beta, low-gamma, mid-gamma): ").strip().lower()
+        signal_types = input("Especifica el tipo de señal, o varios separados por comas (raw, attention, meditation, blink, delta, theta, low-alpha, high-alpha, low-beta, high-beta, low-gamma, mid-gamma): ").strip().lower()
+        signal_types = [st.strip() for st in signal_types.split(',') if st.strip()]
 
-        # Validar el tipo de señal
-        validate_signal_type(signal_type)
+        # Validar los tipos de señal
+        for signal_type in signal_types:
+            validate_signal_type(signal_type)
 
         graph = input("¿Quieres graficar los datos en tiempo real? (s/n): ").strip().lower() == 's'
         
         # Preguntar si el usuario quiere guardar los datos en un archivo CSV
         save_to_csv = input("¿Quieres guardar los datos en un archivo CSV? (s/n): ").strip().lower() == 's'
         csv_file = ""
+        save_format = 'csv'
         if save_to_csv:
             csv_file = input("Especifica el nombre del archivo CSV donde guardar los datos (ej. data.csv): ").strip()
+            if input(f"¿Guardar en formato binario ({RECORDING_EXT}) en lugar de texto? (s/n): ").strip().lower() == 's':
+                save_format = 'binary'
+                csv_file = os.path.splitext(csv_file)[0] + RECORDING_EXT
 
-        collector = NeuroSkyDataCollector(SAMPLE_FREQ, port, signal_type, graph, csv_file, save_to_csv)
+        collector = NeuroSkyDataCollector(SAMPLE_FREQ, port, signal_types, graph, csv_file, save_to_csv,
+                                          save_format=save_format)
         collector.connect()
 
         if collector.interface is None:
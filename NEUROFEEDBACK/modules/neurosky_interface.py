@@ -1,6 +1,6 @@
 import serial
 import threading
-import struct
+import time
 
 class NeuroSkyInterface:
     """
@@ -25,6 +25,27 @@ class NeuroSkyInterface:
     RAW_VALUE = b'\x80'
     ASIC_EEG_POWER = b'\x83'
 
+    # Los mismos códigos como enteros, para compararlos contra bytes indexados
+    SYNC_BYTE = SYNC[0]
+    EXCODE_BYTE = EXCODE[0]
+    POOR_SIGNAL_BYTE = POOR_SIGNAL[0]
+    ATTENTION_BYTE = ATTENTION[0]
+    MEDITATION_BYTE = MEDITATION[0]
+    BLINK_BYTE = BLINK[0]
+    HEADSET_CONNECTED_BYTE = HEADSET_CONNECTED[0]
+    HEADSET_NOT_FOUND_BYTE = HEADSET_NOT_FOUND[0]
+    HEADSET_DISCONNECTED_BYTE = HEADSET_DISCONNECTED[0]
+    REQUEST_DENIED_BYTE = REQUEST_DENIED[0]
+    STANDBY_SCAN_BYTE = STANDBY_SCAN[0]
+    RAW_VALUE_BYTE = RAW_VALUE[0]
+    ASIC_EEG_POWER_BYTE = ASIC_EEG_POWER[0]
+
+    SYNC_SYNC = SYNC + SYNC
+    MAX_PLENGTH = 169   # Longitud máxima de payload según el protocolo ThinkGear
+    READ_CHUNK = 4096   # Bytes máximos por lectura en modo con búfer
+
+    WAVE_NAMES = ('delta', 'theta', 'low-alpha', 'high-alpha', 'low-beta', 'high-beta', 'low-gamma', 'mid-gamma')
+
     STATUS_CONNECTED = 'connected'
     STATUS_SCANNING = 'scanning'
     STATUS_STANDBY = 'standby'
@@ -52,6 +73,17 @@ class NeuroSkyInterface:
                 d['rtscts'] = not d['rtscts']
                 s.applySettingsDict(d)
 
+            if self.interface.buffered:
+                self.read_buffered(s)
+            else:
+                self.read_bytewise(s)
+
+            print('Cerrando conexión...')
+            if s and s.isOpen():
+                s.close()
+
+        def read_bytewise(self, s):
+            """Lee el puerto byte por byte (modo original, una llamada por byte)."""
             while self.interface.running:
                 try:
                     if s.read() == NeuroSkyInterface.SYNC and s.read() == NeuroSkyInterface.SYNC:
@@ -66,49 +98,148 @@ class NeuroSkyInterface:
                         # Lee el payload
                         payload = s.read(plength)
 
-                        # Verifica el checksum
-                        val = sum(b for b in payload[:-1])
+                        # Verifica el checksum; las tramas corruptas se descartan
+                        val = sum(payload)
                         val &= 0xff
                         val = ~val & 0xff
                         chksum = int.from_bytes(s.read(), byteorder='big')
+                        if val != chksum:
+                            self.count_frame_dropped(plength + 4)
+                            continue
 
+                        self.count_frame_ok()
                         self.parse_payload(payload)
                 except serial.SerialException:
                     break
                 except OSError:
                     break
 
-            print('Cerrando conexión...')
-            if s and s.isOpen():
-                s.close()
+        def read_buffered(self, s):
+            """
+            Lee del puerto todos los bytes disponibles en bloques y los acumula
+            en un único bytearray reutilizable, del que se decodifican las tramas.
+            """
+            buf = bytearray()
+            while self.interface.running:
+                try:
+                    # Bloquea hasta tener al menos un byte y toma todo lo disponible
+                    size = min(max(s.in_waiting, 1), NeuroSkyInterface.READ_CHUNK)
+                    chunk = s.read(size)
+                except serial.SerialException:
+                    break
+                except OSError:
+                    break
+                if not chunk:
+                    continue
+                buf += chunk
+                consumed = self.parse_buffer(buf)
+                if consumed:
+                    del buf[:consumed]
+
+        def parse_buffer(self, buf):
+            """
+            Decodifica todas las tramas completas contenidas en buf.
+            Las tramas con checksum inválido se descartan y la búsqueda de SYNC
+            continúa desde el byte siguiente al inicio de la trama descartada.
+            :param buf: bytearray con los bytes recibidos.
+            :return: Número de bytes consumidos desde el inicio de buf. Lo que
+                     resta es una trama incompleta que se completa con la siguiente lectura.
+            """
+            sync = NeuroSkyInterface.SYNC_BYTE
+            n = len(buf)
+            pos = 0
+            with memoryview(buf) as view:
+                while True:
+                    start = buf.find(NeuroSkyInterface.SYNC_SYNC, pos)
+                    if start < 0:
+                        # Conservar un SYNC final que puede iniciar la siguiente trama
+                        consumed = n - 1 if n > pos and buf[n - 1] == sync else n
+                        if consumed > pos:
+                            self.count_skipped_bytes(consumed - pos)
+                        return consumed
+                    if start > pos:
+                        self.count_skipped_bytes(start - pos)
+
+                    # Longitud del paquete (saltando SYNC adicionales)
+                    i = start + 2
+                    while i < n and buf[i] == sync:
+                        i += 1
+                    if i >= n:
+                        return start
+                    plength = buf[i]
+                    if plength > NeuroSkyInterface.MAX_PLENGTH:
+                        self.count_skipped_bytes(i + 1 - start)
+                        pos = i + 1
+                        continue
+
+                    # Payload seguido del byte de checksum
+                    end = i + 1 + plength
+                    if end >= n:
+                        return start
+                    payload = view[i + 1:end]
+                    if (~sum(payload) & 0xff) != buf[end]:
+                        # Resincronizar: el SYNC pudo ser parte de datos corruptos
+                        self.count_frame_dropped(1)
+                        pos = start + 1
+                        continue
+
+                    self.count_frame_ok()
+                    self.parse_payload(payload)
+                    pos = end + 1
+
+        def count_frame_ok(self):
+            """Registra una trama válida y cierra una resincronización pendiente."""
+            interface = self.interface
+            interface.frames_ok += 1
+            if interface.sync_lost_at is not None:
+                latency = time.monotonic() - interface.sync_lost_at
+                interface.sync_lost_at = None
+                interface.resyncs += 1
+                interface.last_resync_latency = latency
+                if latency > interface.max_resync_latency:
+                    interface.max_resync_latency = latency
+
+        def count_frame_dropped(self, nbytes):
+            """Registra una trama descartada por checksum inválido."""
+            self.interface.frames_dropped += 1
+            self.count_skipped_bytes(nbytes)
+
+        def count_skipped_bytes(self, nbytes):
+            """Registra bytes descartados mientras se busca el siguiente SYNC."""
+            interface = self.interface
+            interface.skipped_bytes += nbytes
+            # Sólo cuenta como pérdida de sincronía si ya se habían recibido tramas
+            if interface.sync_lost_at is None and interface.frames_ok:
+                interface.sync_lost_at = time.monotonic()
 
         def parse_payload(self, payload):
-            """Procesa el payload recibido."""
-            while payload:
+            """
+            Procesa el payload recibido.
+            Recorre el payload con un índice en lugar de recortarlo, por lo que
+            acepta bytes o memoryview sin copiar.
+            """
+            n = len(payload)
+            i = 0
+            while i < n:
                 excode = 0
-                try:
-                    code, payload = payload[0], payload[1:]
-                    code_char = struct.pack('B', code)
-                    self.interface.count = self.counter
-                    self.counter += 1
-                    if self.counter >= 100:
-                        self.counter = 0
-                except IndexError:
-                    pass
-
-                while code_char == NeuroSkyInterface.EXCODE:
+                code = payload[i]
+                i += 1
+                self.interface.count = self.counter
+                self.counter += 1
+                if self.counter >= 100:
+                    self.counter = 0
+
+                while code == NeuroSkyInterface.EXCODE_BYTE and i < n:
                     excode += 1
-                    try:
-                        code, payload = payload[0], payload[1:]
-                    except IndexError:
-                        pass
+                    code = payload[i]
+                    i += 1
 
                 if code < 0x80:
-                    try:
-                        value, payload = payload[0], payload[1:]
-                    except IndexError:
-                        pass
-                    if code_char == NeuroSkyInterface.POOR_SIGNAL:
+                    if i >= n:
+                        break
+                    value = payload[i]
+                    i += 1
+                    if code == NeuroSkyInterface.POOR_SIGNAL_BYTE:
                         old_poor_signal = self.interface.poor_signal
                         self.interface.poor_signal = value
                         if self.interface.poor_signal > 0:
@@ -119,55 +250,55 @@ class NeuroSkyInterface:
                             if old_poor_signal > 0:
                                 for handler in self.interface.good_signal_handlers:
                                     handler(self.interface, self.interface.poor_signal)
-                    elif code_char == NeuroSkyInterface.ATTENTION:
+                    elif code == NeuroSkyInterface.ATTENTION_BYTE:
                         self.interface.attention = value
                         for handler in self.interface.attention_handlers:
                             handler(self.interface, self.interface.attention)
-                    elif code_char == NeuroSkyInterface.MEDITATION:
+                    elif code == NeuroSkyInterface.MEDITATION_BYTE:
                         self.interface.meditation = value
                         for handler in self.interface.meditation_handlers:
                             handler(self.interface, self.interface.meditation)
-                    elif code_char == NeuroSkyInterface.BLINK:
+                    elif code == NeuroSkyInterface.BLINK_BYTE:
                         self.interface.blink = value
                         for handler in self.interface.blink_handlers:
                             handler(self.interface, self.interface.blink)
                 else:
-                    try:
-                        vlength, payload = payload[0], payload[1:]
-                    except IndexError:
-                        continue
-                    value, payload = payload[:vlength], payload[vlength:]
+                    if i >= n:
+                        break
+                    vlength = payload[i]
+                    value = payload[i + 1:i + 1 + vlength]
+                    i += 1 + vlength
 
-                    if code_char == NeuroSkyInterface.RAW_VALUE and len(value) >= 2:
+                    if code == NeuroSkyInterface.RAW_VALUE_BYTE and len(value) >= 2:
                         raw = value[0] * 256 + value[1]
                         if raw >= 32768:
                             raw -= 65536
                         self.interface.raw_value = raw
                         for handler in self.interface.raw_value_handlers:
                             handler(self.interface, self.interface.raw_value)
-                    if code_char == NeuroSkyInterface.HEADSET_CONNECTED:
+                    if code == NeuroSkyInterface.HEADSET_CONNECTED_BYTE:
                         run_handlers = self.interface.status != NeuroSkyInterface.STATUS_CONNECTED
                         self.interface.status = NeuroSkyInterface.STATUS_CONNECTED
-                        self.interface.headset_id = value.encode('hex')
+                        self.interface.headset_id = bytes(value).hex()
                         if run_handlers:
                             for handler in self.interface.headset_connected_handlers:
                                 handler(self.interface)
-                    elif code_char == NeuroSkyInterface.HEADSET_NOT_FOUND:
+                    elif code == NeuroSkyInterface.HEADSET_NOT_FOUND_BYTE:
                         if vlength > 0:
-                            not_found_id = value.encode('hex')
+                            not_found_id = bytes(value).hex()
                             for handler in self.interface.headset_notfound_handlers:
                                 handler(self.interface, not_found_id)
                         else:
                             for handler in self.interface.headset_notfound_handlers:
                                 handler(self.interface, None)
-                    elif code_char == NeuroSkyInterface.HEADSET_DISCONNECTED:
-                        headset_id = value.encode('hex')
+                    elif code == NeuroSkyInterface.HEADSET_DISCONNECTED_BYTE:
+                        headset_id = bytes(value).hex()
                         for handler in self.interface.headset_disconnected_handlers:
                             handler(self.interface, headset_id)
-                    elif code_char == NeuroSkyInterface.REQUEST_DENIED:
+                    elif code == NeuroSkyInterface.REQUEST_DENIED_BYTE:
                         for handler in self.interface.request_denied_handlers:
                             handler(self.interface)
-                    elif code_char == NeuroSkyInterface.STANDBY_SCAN:
+                    elif code == NeuroSkyInterface.STANDBY_SCAN_BYTE:
                         try:
                             byte = value[0]
                         except IndexError:
@@ -184,17 +315,22 @@ class NeuroSkyInterface:
                             if run_handlers:
                                 for handler in self.interface.standby_handlers:
                                     handler(self.interface)
-                    elif code_char == NeuroSkyInterface.ASIC_EEG_POWER:
+                    elif code == NeuroSkyInterface.ASIC_EEG_POWER_BYTE and len(value) >= 24:
                         j = 0
-                        for i in ['delta', 'theta', 'low-alpha', 'high-alpha', 'low-beta', 'high-beta', 'low-gamma', 'mid-gamma']:
-                            self.interface.waves[i] = value[j] * 255 * 255 + value[j + 1] * 255 + value[j + 2]
+                        for k in NeuroSkyInterface.WAVE_NAMES:
+                            self.interface.waves[k] = value[j] * 255 * 255 + value[j + 1] * 255 + value[j + 2]
                             j += 3
                         for handler in self.interface.waves_handlers:
                             handler(self.interface, self.interface.waves)
 
-    def __init__(self, device, headset_id=None, open_serial=True):
-        """Inicializa la interfaz con el dispositivo."""
+    def __init__(self, device, headset_id=None, open_serial=True, buffered=True):
+        """
+        Inicializa la interfaz con el dispositivo.
+        :param buffered: Si es True, el listener lee bloques completos del puerto;
+                         si es False, usa la lectura original byte por byte.
+        """
         self.dongle = None
+        self.buffered = buffered
         self.listener = None
         self.device = device
         self.headset_id = headset_id
@@ -208,6 +344,15 @@ class NeuroSkyInterface:
         self.count = 0
         self.running = False
 
+        # Estadísticas del decodificador
+        self.frames_ok = 0
+        self.frames_dropped = 0
+        self.skipped_bytes = 0
+        self.resyncs = 0
+        self.last_resync_latency = 0.0
+        self.max_resync_latency = 0.0
+        self.sync_lost_at = None
+
         # Manejadores de eventos
         self.poor_signal_handlers = []
         self.good_signal_handlers = []
@@ -226,12 +371,44 @@ class NeuroSkyInterface:
         if open_serial:
             self.serial_open()
 
+    def get_stats(self):
+        """
+        Obtener las estadísticas del decodificador ThinkGear.
+        :return: Diccionario con tramas válidas/descartadas, bytes descartados
+                 buscando SYNC y latencias de resincronización (en segundos).
+        """
+        total = self.frames_ok + self.frames_dropped
+        return {
+            'frames_ok': self.frames_ok,
+            'frames_dropped': self.frames_dropped,
+            'bytes_skipped': self.skipped_bytes,
+            'drop_rate': self.frames_dropped / total if total else 0.0,
+            'resyncs': self.resyncs,
+            'last_resync_latency': self.last_resync_latency,
+            'max_resync_latency': self.max_resync_latency,
+        }
+
+    def reset_stats(self):
+        """Reinicia las estadísticas del decodificador."""
+        self.frames_ok = 0
+        self.frames_dropped = 0
+        self.skipped_bytes = 0
+        self.resyncs = 0
+        self.last_resync_latency = 0.0
+        self.max_resync_latency = 0.0
+        self.sync_lost_at = None
+
     def serial_open(self):
         """Abre la conexión serial y comienza a escuchar los datos."""
         if not self.dongle or not self.dongle.isOpen():
-            self.dongle = serial.Serial(self.device, 115200)
+            from modules.neurosky_simulator import is_simulated_port, open_simulated_port
+            if is_simulated_port(self.device):
+                # Puerto especial 'sim...': diadema simulada (ver modules/neurosky_simulator.py)
+                self.dongle = open_simulated_port(self.device)
+            else:
+                self.dongle = serial.Serial(self.device, 115200)
 
-        if not self.listener or not self.listener.isAlive():
+        if not self.listener or not self.listener.is_alive():
             self.listener = self.SerialListener(self)
             self.listener.daemon = True
             self.listener.start()
@@ -0,0 +1,301 @@
+"""
+neurosky_simulator.py — Diadema NeuroSky simulada para NEURODAC.
+
+Emite paquetes ThinkGear válidos (raw a 512 Hz y, una vez por segundo, señal
+pobre + potencias ASIC + attention/meditation) a través de un objeto con la
+misma interfaz que serial.Serial, de modo que NeuroSkyInterface la usa sin
+cambios. Se selecciona escribiendo un puerto especial:
+
+    sim                      señal sintética en tiempo real
+    sim@4                    señal sintética a 4x (sim@0: lo más rápido posible)
+    sim:ruta/archivo.csv     reproduce una grabación CSV o binaria (.ndr)
+    sim:ruta/archivo.ndr@2   reproduce una grabación a 2x
+"""
+
+import os
+import threading
+import time
+
+import numpy as np
+import serial
+
+SIMULATED_PREFIX = 'sim'
+SIM_SAMPLE_FREQ = 512
+RAW_PACKET_SIZE = 8  # SYNC SYNC PLENGTH 0x80 0x02 HI LO CHKSUM
+
+WAVE_NAMES = ('delta', 'theta', 'low-alpha', 'high-alpha', 'low-beta', 'high-beta', 'low-gamma', 'mid-gamma')
+
+
+# =============================================================
+# Codificación de paquetes ThinkGear
+# =============================================================
+def encode_packet(payload):
+    """
+    Envolver un payload en una trama ThinkGear (SYNC SYNC PLENGTH payload CHKSUM).
+    :param payload: Bytes del payload (máximo 169).
+    :return: Bytes de la trama.
+    """
+    payload = bytes(payload)
+    return b'\xaa\xaa' + bytes([len(payload)]) + payload + bytes([~sum(payload) & 0xff])
+
+
+def encode_raw_packets(values):
+    """
+    Codificar un bloque de muestras raw como tramas consecutivas, sin bucles de Python.
+    :param values: Arreglo de enteros de 16 bits con signo.
+    :return: Bytes con len(values) tramas de RAW_PACKET_SIZE bytes.
+    """
+    values = np.asarray(values, dtype=np.int16).astype('>i2').view(np.uint8).reshape(-1, 2)
+    packets = np.empty((len(values), RAW_PACKET_SIZE), dtype=np.uint8)
+    packets[:, 0:2] = 0xaa
+    packets[:, 2] = 0x04
+    packets[:, 3] = 0x80
+    packets[:, 4] = 0x02
+    packets[:, 5:7] = values
+    packets[:, 7] = ~(0x82 + values[:, 0].astype(np.int32) + values[:, 1]) & 0xff
+    return packets.tobytes()
+
+
+def encode_esense_packet(poor_signal, attention, meditation, waves):
+    """
+    Codificar la trama de 1 Hz: señal pobre, potencias ASIC, attention y meditation.
+    :param poor_signal: Calidad de señal (0 = buena, 200 = sin contacto).
+    :param attention: Índice de atención (0–100).
+    :param meditation: Índice de meditación (0–100).
+    :param waves: Secuencia con las 8 potencias ASIC (enteros de 24 bits).
+    :return: Bytes de la trama.
+    """
+    payload = bytearray([0x02, int(poor_signal), 0x83, 0x18])
+    for power in waves:
+        payload += int(min(max(power, 0), 0xffffff)).to_bytes(3, 'big')
+    payload += bytes([0x04, min(max(int(attention), 0), 255), 0x05, min(max(int(meditation), 0), 255)])
+    return encode_packet(payload)
+
+
+# =============================================================
+# Fuentes de datos
+# =============================================================
+class SyntheticSource:
+    """
+    Genera un segundo de señal por bloque: ritmo alpha (10 Hz) y theta (6 Hz) con
+    ruido para raw, caminatas aleatorias para attention/meditation y potencias
+    ASIC con distribución lognormal.
+    """
+
+    def __init__(self, seed=None):
+        self.rng = np.random.default_rng(seed)
+        self.second = 0
+        self.attention = 50.0
+        self.meditation = 50.0
+
+    def next_block(self):
+        """Bytes de las tramas de un segundo de datos."""
+        t = (self.second * SIM_SAMPLE_FREQ + np.arange(SIM_SAMPLE_FREQ)) / SIM_SAMPLE_FREQ
+        raw = (120 * np.sin(2 * np.pi * 10 * t) + 60 * np.sin(2 * np.pi * 6 * t)
+               + self.rng.normal(0, 30, SIM_SAMPLE_FREQ))
+        self.attention = float(np.clip(self.attention + self.rng.normal(0, 8), 0, 100))
+        self.meditation = float(np.clip(self.meditation + self.rng.normal(0, 8), 0, 100))
+        waves = np.clip(self.rng.lognormal(11, 1, len(WAVE_NAMES)), 0, 0xffffff)
+        self.second += 1
+        return encode_raw_packets(np.clip(raw, -2048, 2047)) + encode_esense_packet(
+            0, self.attention, self.meditation, waves
+        )
+
+
+class ReplaySource:
+    """
+    Reproduce una grabación (CSV del recolector o de set_to_csv, o binaria .ndr) en
+    bucle. Se usa la columna/señal raw (o la primera); attention y meditation se
+    reproducen si la grabación las contiene y, si no, se sintetizan.
+    """
+
+    def __init__(self, path, seed=None):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No se encontró el archivo de reproducción: {path}")
+        self.synthetic = SyntheticSource(seed)
+        self.streams = load_replay_streams(path)
+        if 'raw' not in self.streams or not len(self.streams['raw']):
+            raise ValueError(f"El archivo {path} no contiene muestras para reproducir.")
+        self.position = 0
+        self.second = 0
+
+    def next_block(self):
+        """Bytes de las tramas de un segundo de datos."""
+        raw = self.streams['raw']
+        idx = (self.position + np.arange(SIM_SAMPLE_FREQ)) % len(raw)
+        self.position = (self.position + SIM_SAMPLE_FREQ) % len(raw)
+        # El bloque sintético sólo aporta attention/meditation/ASIC si faltan en la grabación
+        self.synthetic.next_block()
+        attention = self.stream_value('attention', self.synthetic.attention)
+        meditation = self.stream_value('meditation', self.synthetic.meditation)
+        waves = [self.stream_value(name, 0) for name in WAVE_NAMES]
+        self.second += 1
+        return encode_raw_packets(np.clip(raw[idx], -32768, 32767)) + encode_esense_packet(
+            0, attention, meditation, waves
+        )
+
+    def stream_value(self, name, default):
+        """Valor de la señal lenta `name` para el segundo actual (o `default`)."""
+        values = self.streams.get(name)
+        if values is None or not len(values):
+            return default
+        return values[self.second % len(values)]
+
+
+def load_replay_streams(path):
+    """
+    Leer las señales de una grabación para reproducirlas.
+    :param path: Ruta de un CSV (Timestamp,<Señal>..., o Timestamp,Signal,Value) o de un .ndr.
+    :return: Diccionario {tipo de señal: arreglo de valores}.
+    """
+    from modules.recording import open_recording, read_stream, RECORDING_EXT
+
+    if path.lower().endswith(RECORDING_EXT):
+        metadata, records = open_recording(path)
+        streams = {st: np.asarray(read_stream(metadata, records, st)[1]) for st in metadata['signals']}
+        if 'raw' not in streams:
+            streams['raw'] = streams[metadata['signals'][0]]
+        return streams
+
+    import pandas as pd
+    df = pd.read_csv(path)
+    df.columns = df.columns.str.strip()
+    if {'Signal', 'Value'} <= set(df.columns):
+        return {st: group['Value'].to_numpy() for st, group in df.groupby('Signal')}
+    columns = [col for col in df.columns if col.lower() not in ('timestamp', 'git timestamp')]
+    streams = {col.lower(): df[col].to_numpy() for col in columns}
+    if 'raw' not in streams and columns:
+        streams['raw'] = df[columns[0]].to_numpy()
+    return streams
+
+
+# =============================================================
+# Puerto serial simulado
+# =============================================================
+class SimulatedDongle:
+    """
+    Objeto con la interfaz de serial.Serial que usa NeuroSkyInterface (read, write,
+    in_waiting, getSettingsDict, applySettingsDict, isOpen, close). Los bytes se
+    entregan al ritmo de una diadema real multiplicado por `speed`.
+    """
+
+    def __init__(self, source, speed=1.0):
+        """
+        :param source: Objeto con next_block() que regresa los bytes de un segundo.
+        :param speed: Factor de velocidad (1 = tiempo real; 0 = sin esperas).
+        """
+        self.source = source
+        self.speed = speed
+        self.settings = {'rtscts': False}
+        self.is_open = True
+        self.lock = threading.Lock()
+        self.pending = bytearray()
+        self.block = b''
+        self.block_pos = 0  # Muestras del bloque actual ya entregadas
+        self.samples_sent = 0
+        self.start_time = time.monotonic()
+
+    # --- API de serial.Serial ---
+    def isOpen(self):
+        return self.is_open
+
+    def close(self):
+        self.is_open = False
+
+    def write(self, data):
+        """Los comandos (CONNECT, DISCONNECT, ...) se aceptan y se ignoran."""
+        return len(data)
+
+    def getSettingsDict(self):
+        return dict(self.settings)
+
+    def applySettingsDict(self, d):
+        self.settings.update(d)
+
+    @property
+    def in_waiting(self):
+        with self.lock:
+            # Sin esperas sólo se genera al leer, para que `pending` no crezca con cada consulta
+            if self.speed > 0:
+                self.generate_due()
+            return len(self.pending)
+
+    def read(self, size=1):
+        """Bloquea hasta tener `size` bytes, como un puerto serial sin timeout."""
+        while True:
+            if not self.is_open:
+                raise serial.PortNotOpenError()
+            with self.lock:
+                if self.speed > 0 or len(self.pending) < size:
+                    self.generate_due()
+                if len(self.pending) >= size:
+                    data = bytes(self.pending[:size])
+                    del self.pending[:size]
+                    return data
+                wait = self.time_to_next_sample()
+            time.sleep(wait)
+
+    # --- Generación temporizada ---
+    def samples_due(self):
+        """
+        Muestras que una diadema real habría enviado desde la apertura. Sin esperas
+        (speed <= 0) es un segundo más de lo ya enviado; read() sólo lo pide cuando
+        faltan bytes, así que `pending` nunca pasa de una lectura más un segundo.
+        """
+        if self.speed <= 0:
+            return self.samples_sent + SIM_SAMPLE_FREQ
+        return int((time.monotonic() - self.start_time) * SIM_SAMPLE_FREQ * self.speed)
+
+    def time_to_next_sample(self):
+        if self.speed <= 0:
+            return 0
+        due_at = self.start_time + (self.samples_sent + 1) / (SIM_SAMPLE_FREQ * self.speed)
+        return max(0.0, due_at - time.monotonic())
+
+    def generate_due(self):
+        """Pasa a `pending` los bytes de las muestras que ya deberían haber llegado."""
+        due = self.samples_due()
+        while self.samples_sent < due:
+            if self.block_pos == 0:
+                self.block = self.source.next_block()
+            n = min(SIM_SAMPLE_FREQ - self.block_pos, due - self.samples_sent)
+            end = self.block_pos + n
+            if end == SIM_SAMPLE_FREQ:
+                # La trama de 1 Hz sigue a la última muestra raw del segundo
+                self.pending += self.block[self.block_pos * RAW_PACKET_SIZE:]
+                self.block_pos = 0
+            else:
+                self.pending += self.block[self.block_pos * RAW_PACKET_SIZE:end * RAW_PACKET_SIZE]
+                self.block_pos = end
+            self.samples_sent += n
+
+
+def is_simulated_port(port):
+    """
+    Indica si el nombre de puerto selecciona la diadema simulada.
+    :param port: Nombre del puerto escrito por el usuario.
+    """
+    if not isinstance(port, str):
+        return False
+    name = port.strip().lower()
+    return name == SIMULATED_PREFIX or name.startswith((SIMULATED_PREFIX + ':', SIMULATED_PREFIX + '@'))
+
+
+def open_simulated_port(port):
+    """
+    Crear la diadema simulada descrita por el nombre de puerto (ver el encabezado del módulo).
+    :param port: 'sim', 'sim@<velocidad>', 'sim:<archivo>' o 'sim:<archivo>@<velocidad>'.
+    :return: SimulatedDongle listo para NeuroSkyInterface.
+    :raises ValueError: Si la velocidad no es un número.
+    """
+    spec = port.strip()[len(SIMULATED_PREFIX):]
+    speed = 1.0
+    if '@' in spec:
+        spec, speed_text = spec.rsplit('@', 1)
+        try:
+            speed = float(speed_text)
+        except ValueError:
+            raise ValueError(f"Velocidad de simulación inválida: {speed_text}")
+    path = spec[1:].strip() if spec.startswith(':') else ''
+    source = ReplaySource(path) if path else SyntheticSource()
+    return SimulatedDongle(source, speed)
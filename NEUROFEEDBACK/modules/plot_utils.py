@@ -0,0 +1,67 @@
+import base64
+
+import numpy as np
+import plotly.graph_objs as go
+
+# Puntos por figura a partir de los cuales se dibuja con WebGL (Scattergl) en lugar
+# de SVG; por debajo SVG se ve igual y no consume un contexto WebGL del navegador
+WEBGL_THRESHOLD = 5000
+
+# Tipos que plotly.js acepta en arreglos tipados (sin enteros de 64 bits)
+PLOTLY_DTYPES = ('i1', 'u1', 'i2', 'u2', 'i4', 'u4', 'f4', 'f8')
+
+
+def get_colors(theme):
+    """Retorna colores de gráfica según el tema activo ('dark' o 'light')."""
+    if theme == 'dark':
+        return {
+            'bg': '#222', 'paper': '#222', 'font': '#fff',
+            'grid': 'rgba(255,255,255,0.08)',
+            'zero': 'rgba(255,255,255,0.2)',
+            'trace': '#4DA8DA',
+        }
+    return {
+        'bg': '#fff', 'paper': '#fff', 'font': '#212529',
+        'grid': 'rgba(0,0,0,0.06)',
+        'zero': 'rgba(0,0,0,0.15)',
+        'trace': '#375a7f',
+    }
+
+
+def use_webgl(n_points):
+    """
+    Indica si una figura con `n_points` puntos en total debe dibujarse con WebGL.
+    :param n_points: Total de puntos de todas las trazas de la figura.
+    """
+    return n_points > WEBGL_THRESHOLD
+
+
+def line_trace(x=None, y=None, n_points=None, **kwargs):
+    """
+    Traza de líneas: go.Scattergl si la figura supera WEBGL_THRESHOLD puntos, go.Scatter si no.
+    Todas las trazas de una figura deben recibir el mismo `n_points` para que se
+    dibujen con el mismo motor.
+    :param x: Valores del eje X (opcional).
+    :param y: Valores del eje Y.
+    :param n_points: Total de puntos de la figura (por omisión, los de esta traza).
+    :param kwargs: Propiedades adicionales de la traza (line, name, yaxis, ...).
+    """
+    if n_points is None:
+        n_points = len(y) if y is not None else 0
+    trace_cls = go.Scattergl if use_webgl(n_points) else go.Scatter
+    return trace_cls(x=x, y=y, mode='lines', **kwargs)
+
+
+def typed_array(values):
+    """
+    Codificar un arreglo numérico como arreglo tipado de plotly.js ({dtype, bdata}),
+    el mismo formato que usa plotly al serializar una figura. Sirve para enviar
+    x/y en actualizaciones parciales (Patch) sin convertirlos a listas JSON.
+    :param values: Arreglo 1D de NumPy (float32/float64/enteros).
+    """
+    values = np.asarray(values)
+    dtype = values.dtype.newbyteorder('<')
+    if dtype.str[1:] not in PLOTLY_DTYPES:
+        dtype = np.dtype('<f8')
+    values = np.ascontiguousarray(values, dtype=dtype)
+    return {'dtype': dtype.str[1:], 'bdata': base64.b64encode(values.tobytes()).decode('ascii')}
@@ -0,0 +1,140 @@
+import json
+import os
+
+import numpy as np
+
+PYRAMID_EXT = '.pyramid'
+PYRAMID_MIN_BLOCKS = 256  # El último nivel tiene a lo más este número de bloques
+
+
+class MinMaxPyramid:
+    """
+    Pirámide de envolventes mín/máx de una grabación (canales x muestras).
+
+    El nivel con factor f (2, 4, 8, ...) guarda, para cada bloque de f muestras,
+    el mínimo y el máximo de cada canal. Cada nivel se calcula a partir del
+    anterior, así que construirla cuesta una pasada sobre los datos. Para graficar
+    una ventana se elige el nivel más fino que da a lo más `n_out` bloques, de modo
+    que el costo no depende de la duración de la ventana.
+
+    La pirámide se guarda junto al archivo de datos, en un directorio
+    <archivo>.pyramid con un .npy por nivel (se abren mapeados en memoria) y un
+    meta.json; si el archivo de datos cambia de tamaño o fecha, se reconstruye.
+    """
+
+    def __init__(self, levels, n_samples):
+        """
+        :param levels: Diccionario {factor: arreglo (2, canales, bloques)} con mínimos y máximos.
+        :param n_samples: Número de muestras de la grabación original.
+        """
+        self.levels = levels
+        self.factors = sorted(levels)
+        self.n_samples = n_samples
+
+    @classmethod
+    def build(cls, data):
+        """
+        Construir la pirámide en memoria.
+        :param data: Arreglo (canales x muestras).
+        :return: MinMaxPyramid.
+        """
+        data = np.atleast_2d(data)
+        levels = {}
+        lo = hi = data
+        factor = 1
+        while lo.shape[1] > PYRAMID_MIN_BLOCKS:
+            if lo.shape[1] % 2:
+                # Bloque final incompleto: repetir la última columna
+                lo = np.concatenate([lo, lo[:, -1:]], axis=1)
+                hi = np.concatenate([hi, hi[:, -1:]], axis=1)
+            lo = lo.reshape(lo.shape[0], -1, 2).min(axis=2).astype(np.float32)
+            hi = hi.reshape(hi.shape[0], -1, 2).max(axis=2).astype(np.float32)
+            factor *= 2
+            levels[factor] = np.stack([lo, hi])
+        return cls(levels, data.shape[1])
+
+    @classmethod
+    def load_or_build(cls, source_path, data):
+        """
+        Abrir la pirámide guardada junto a `source_path` o construirla y guardarla.
+        Si no se puede escribir en el directorio de datos, se usa sólo en memoria.
+        :param source_path: Ruta del archivo de la grabación.
+        :param data: Arreglo (canales x muestras) de la grabación.
+        :return: MinMaxPyramid.
+        """
+        directory = source_path + PYRAMID_EXT
+        stat = os.stat(source_path)
+        source = {'size': stat.st_size, 'mtime': stat.st_mtime, 'shape': list(np.shape(data))}
+        meta_path = os.path.join(directory, 'meta.json')
+
+        if os.path.exists(meta_path):
+            try:
+                with open(meta_path) as fh:
+                    meta = json.load(fh)
+                if meta['source'] == source:
+                    levels = {
+                        int(f): np.load(os.path.join(directory, f'level_{f}.npy'), mmap_mode='r')
+                        for f in meta['factors']
+                    }
+                    return cls(levels, data.shape[1])
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Pirámide inválida en {directory}, se reconstruye: {e}")
+
+        pyramid = cls.build(data)
+        try:
+            pyramid.save(directory, source)
+        except OSError as e:
+            print(f"No se pudo guardar la pirámide en {directory}: {e}")
+        return pyramid
+
+    def save(self, directory, source):
+        """
+        Guardar los niveles en `directory`.
+        :param directory: Directorio de destino (se crea si no existe).
+        :param source: Datos del archivo original para detectar cambios.
+        """
+        os.makedirs(directory, exist_ok=True)
+        for factor in self.factors:
+            np.save(os.path.join(directory, f'level_{factor}.npy'), self.levels[factor])
+        # meta.json se escribe al final: sin él la pirámide se considera incompleta
+        with open(os.path.join(directory, 'meta.json'), 'w') as fh:
+            json.dump({'source': source, 'factors': self.factors}, fh)
+
+    def choose_factor(self, n_samples, n_out):
+        """
+        Factor del nivel más fino que representa `n_samples` muestras con a lo más `n_out` bloques.
+        :return: Factor, o None si la ventana ya cabe en `n_out` muestras (no hace falta pirámide).
+        """
+        if n_samples <= n_out:
+            return None
+        for factor in self.factors:
+            if -(-n_samples // factor) <= n_out:
+                return factor
+        return self.factors[-1] if self.factors else None
+
+    def query(self, picks, start_idx, end_idx, n_out):
+        """
+        Envolvente mín/máx de una ventana para graficar.
+        :param picks: Lista de índices de canal.
+        :param start_idx: Primera muestra de la ventana.
+        :param end_idx: Muestra final (exclusiva).
+        :param n_out: Número máximo de bloques (~ancho en píxeles).
+        :return: Tupla (x, y) con x en muestras (1D) e y de forma (canales, 2 * bloques),
+                 o None si la ventana es suficientemente corta para graficarla completa.
+        """
+        end_idx = min(end_idx, self.n_samples)
+        factor = self.choose_factor(end_idx - start_idx, n_out)
+        if factor is None:
+            return None
+        level = self.levels[factor]
+        first = start_idx // factor
+        last = -(-end_idx // factor)
+        lo = level[0, picks, first:last]
+        hi = level[1, picks, first:last]
+
+        # Un punto mínimo y uno máximo por bloque: cada bloque se dibuja como un segmento vertical
+        y = np.empty((len(picks), 2 * (last - first)), dtype=level.dtype)
+        y[:, 0::2] = lo
+        y[:, 1::2] = hi
+        x = np.repeat(np.arange(first, last) * factor, 2)
+        return x, y
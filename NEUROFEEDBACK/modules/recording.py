@@ -0,0 +1,325 @@
+import json
+import os
+import struct
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+FLUSH_INTERVAL = 0.5  # Segundos entre escrituras de bloque
+
+# Formato binario de grabación (.ndr):
+#   MAGIC (8 bytes) | longitud del encabezado (uint32 LE) | encabezado JSON | registros
+# El encabezado se rellena con espacios para que los registros inicien en un múltiplo
+# de 64 bytes. Cada registro tiene el ancho fijo del dtype estructurado descrito en el
+# encabezado, así que la grabación se puede abrir con np.memmap sin leerla.
+# Con una sola señal el registro es (Timestamp, <Señal>); con varias señales se
+# graba un solo archivo multiflujo con registros (Timestamp, Stream, Value), donde
+# Stream es el índice de la señal en la lista 'signals' del encabezado. Los .set
+# convertidos con data/set_to_csv.py usan un campo por canal: (Timestamp, <Canal>, ...).
+RECORDING_EXT = '.ndr'
+RECORDING_MAGIC = b'NDACREC\x00'
+RECORDING_VERSION = 1
+RECORDING_ALIGN = 64
+
+
+def signal_dtype(signal_type):
+    """
+    Tipo de dato con el que se guarda cada señal en el formato binario.
+    :param signal_type: Tipo de señal ('raw', 'attention', 'delta', etc.).
+    :return: Cadena de dtype de NumPy.
+    """
+    # Raw y los índices eSense caben en 16 bits; las potencias ASIC usan 24 bits
+    if signal_type in ('raw', 'attention', 'meditation', 'blink'):
+        return '<i2'
+    return '<i4'
+
+
+class BatchWriter:
+    """
+    Base de los escritores por bloques del recolector de datos.
+
+    append() sólo agrega la muestra a una cola en memoria; un hilo en segundo plano
+    toma las muestras pendientes y las escribe en un solo bloque cada `flush_interval`
+    segundos. close() escribe lo pendiente y sincroniza el archivo con el disco antes
+    de cerrarlo. Si una escritura falla, el hilo se detiene, se descartan las muestras
+    pendientes y tanto append() como close() lanzan IOError con el error original.
+    Las subclases implementan write_rows().
+    """
+
+    def __init__(self, path, flush_interval=FLUSH_INTERVAL, mode='w'):
+        """
+        Abre el archivo e inicia el hilo de escritura.
+        :param path: Ruta del archivo.
+        :param flush_interval: Segundos entre escrituras de bloque.
+        :param mode: Modo de apertura del archivo.
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        self.pending = deque()
+        self.error = None
+        self.file_handle = open(path, mode=mode, newline=None if 'b' in mode else '')
+        self.write_header()
+        self.stop_event = threading.Event()
+        self.writer_thread = threading.Thread(target=self.run, daemon=True)
+        self.writer_thread.start()
+
+    def write_header(self):
+        """Escribe el encabezado del archivo (opcional en las subclases)."""
+
+    def write_rows(self, rows):
+        """
+        Escribe un bloque de muestras.
+        :param rows: Lista de tuplas (timestamp, value, stream).
+        """
+        raise NotImplementedError
+
+    def append(self, timestamp, value, stream=0):
+        """
+        Encolar una muestra para escribirla en el siguiente bloque.
+        :param timestamp: Tiempo de llegada de la muestra.
+        :param value: Valor de la señal.
+        :param stream: Índice de la señal en signal_types (grabaciones multiflujo).
+        :raises IOError: Si el hilo de escritura ya falló (las muestras no se acumulan).
+        """
+        if self.error is not None:
+            self.raise_error()
+        self.pending.append((timestamp, value, stream))
+
+    def run(self):
+        """Escribe los bloques pendientes hasta que se llame a close()."""
+        while not self.stop_event.wait(self.flush_interval):
+            try:
+                self.write_pending()
+                self.file_handle.flush()
+            except (IOError, ValueError) as e:
+                print(f"Error al escribir en el archivo {self.path}: {e}")
+                self.error = e
+                self.pending.clear()  # Ya no se escribirán; no retenerlas en memoria
+                return
+
+    def raise_error(self):
+        """Lanzar IOError con el error que detuvo el hilo de escritura."""
+        raise IOError(f"Error al escribir en el archivo {self.path}: {self.error}") from self.error
+
+    def write_pending(self):
+        """Toma las muestras encoladas y las escribe en un solo bloque."""
+        pending = self.pending
+        n = len(pending)
+        if not n:
+            return
+        popleft = pending.popleft
+        self.write_rows([popleft() for _ in range(n)])
+
+    def close(self):
+        """
+        Detener el hilo de escritura, escribir las muestras pendientes y cerrar el archivo.
+        Al regresar, todas las muestras encoladas están escritas y sincronizadas en disco.
+        :raises IOError: Si alguna escritura falló (el archivo se cierra de todos modos).
+        """
+        self.stop_event.set()
+        self.writer_thread.join()
+        if self.file_handle.closed:
+            return
+        try:
+            if self.error is None:
+                self.write_pending()
+            self.file_handle.flush()
+            os.fsync(self.file_handle.fileno())
+        finally:
+            self.file_handle.close()
+        if self.error is not None:
+            self.raise_error()
+
+
+class BatchCSVWriter(BatchWriter):
+    """
+    Escritor de CSV por bloques. Con una señal las columnas son Timestamp,<Señal>;
+    con varias, Timestamp,Signal,Value (una fila por muestra de cualquier señal).
+    """
+
+    def __init__(self, path, signal_types, flush_interval=FLUSH_INTERVAL):
+        """
+        :param path: Ruta del archivo CSV.
+        :param signal_types: Lista de tipos de señal que se graban.
+        :param flush_interval: Segundos entre escrituras de bloque.
+        """
+        self.signal_types = list(signal_types)
+        if len(self.signal_types) == 1:
+            self.header = ['Timestamp', self.signal_types[0].capitalize()]
+        else:
+            self.header = ['Timestamp', 'Signal', 'Value']
+        super().__init__(path, flush_interval)
+
+    def write_header(self):
+        self.file_handle.write(','.join(self.header) + '\n')
+
+    def write_rows(self, rows):
+        if len(self.signal_types) == 1:
+            lines = [f"{timestamp:.6f},{value}\n" for timestamp, value, _ in rows]
+        else:
+            names = self.signal_types
+            lines = [f"{timestamp:.6f},{names[stream]},{value}\n" for timestamp, value, stream in rows]
+        self.file_handle.write(''.join(lines))
+
+
+class BatchBinaryWriter(BatchWriter):
+    """
+    Escritor por bloques del formato binario de grabación (.ndr).
+    Con una señal cada registro es (Timestamp float64, <Señal> entero de ancho fijo);
+    con varias es (Timestamp, Stream uint8, Value entero de ancho fijo).
+    """
+
+    def __init__(self, path, signal_types, sample_freq=None, flush_interval=FLUSH_INTERVAL, metadata=None):
+        """
+        :param path: Ruta del archivo .ndr.
+        :param signal_types: Lista de tipos de señal que se graban.
+        :param sample_freq: Frecuencia de muestreo nominal (se guarda en el encabezado).
+        :param flush_interval: Segundos entre escrituras de bloque.
+        :param metadata: Diccionario opcional con datos adicionales para el encabezado.
+        """
+        signal_types = list(signal_types)
+        if len(signal_types) == 1:
+            self.dtype = np.dtype([('Timestamp', '<f8'), (signal_types[0].capitalize(), signal_dtype(signal_types[0]))])
+        else:
+            value_dtype = max((np.dtype(signal_dtype(st)) for st in signal_types), key=lambda dt: dt.itemsize)
+            self.dtype = np.dtype([('Timestamp', '<f8'), ('Stream', 'u1'), ('Value', value_dtype.str)])
+        self.metadata = {
+            'version': RECORDING_VERSION,
+            'dtype': self.dtype.descr,
+            'signals': signal_types,
+            'sfreq': sample_freq,
+            'created': time.time(),
+        }
+        self.metadata.update(metadata or {})
+        super().__init__(path, flush_interval, mode='wb')
+
+    def write_header(self):
+        self.file_handle.write(encode_recording_header(self.metadata))
+
+    def write_rows(self, rows):
+        block = np.empty(len(rows), dtype=self.dtype)
+        timestamps, values, streams = zip(*rows)
+        block['Timestamp'] = timestamps
+        block[self.dtype.names[-1]] = values
+        if 'Stream' in self.dtype.names:
+            block['Stream'] = streams
+        self.file_handle.write(block.tobytes())
+
+
+def encode_recording_header(metadata):
+    """
+    Codificar el encabezado del formato binario, alineado a RECORDING_ALIGN bytes.
+    :param metadata: Diccionario serializable a JSON; debe incluir 'dtype'.
+    :return: Bytes del encabezado completo (incluye MAGIC y longitud).
+    """
+    header = json.dumps(metadata).encode('utf-8')
+    prefix = len(RECORDING_MAGIC) + 4
+    padding = -(prefix + len(header)) % RECORDING_ALIGN
+    header += b' ' * padding
+    return RECORDING_MAGIC + struct.pack('<I', len(header)) + header
+
+
+def read_recording_header(path):
+    """
+    Leer el encabezado de una grabación binaria.
+    :param path: Ruta del archivo .ndr.
+    :return: Tupla (metadata, offset) con el encabezado y la posición del primer registro.
+    :raises ValueError: Si el archivo no es una grabación binaria de NEURODAC.
+    """
+    with open(path, 'rb') as fh:
+        magic = fh.read(len(RECORDING_MAGIC))
+        if magic != RECORDING_MAGIC:
+            raise ValueError(f"{path} no es una grabación binaria de NEURODAC.")
+        (length,) = struct.unpack('<I', fh.read(4))
+        metadata = json.loads(fh.read(length).decode('utf-8'))
+    return metadata, len(RECORDING_MAGIC) + 4 + length
+
+
+def open_recording(path):
+    """
+    Abrir una grabación binaria mapeándola en memoria (no lee los registros).
+    Un último registro incompleto (p. ej. por un corte de energía) se ignora.
+    :param path: Ruta del archivo .ndr.
+    :return: Tupla (metadata, records) donde records es un arreglo estructurado de solo lectura.
+    """
+    metadata, offset = read_recording_header(path)
+    dtype = np.dtype([tuple(field) for field in metadata['dtype']])
+    n_records = (os.path.getsize(path) - offset) // dtype.itemsize
+    if n_records <= 0:
+        return metadata, np.empty(0, dtype=dtype)
+    records = np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=(n_records,))
+    return metadata, records
+
+
+def read_stream(metadata, records, signal_type):
+    """
+    Extraer una señal de una grabación binaria (de una o de varias señales).
+    :param metadata: Encabezado devuelto por open_recording().
+    :param records: Registros devueltos por open_recording().
+    :param signal_type: Tipo de señal a extraer.
+    :return: Tupla (timestamps, values) de arreglos de NumPy.
+    """
+    signals = metadata['signals']
+    if signal_type not in signals:
+        raise ValueError(f"La grabación no contiene la señal {signal_type}. Señales: {', '.join(signals)}")
+    if 'Stream' not in records.dtype.names:
+        # Un campo por señal (p. ej. los canales de un .set convertido) o una sola señal
+        fields = records.dtype.names[1:]
+        field = next((name for name in fields if name.lower() == signal_type.lower()), fields[-1])
+        return records['Timestamp'], records[field]
+    mask = records['Stream'] == signals.index(signal_type)
+    return records['Timestamp'][mask], records['Value'][mask]
+
+
+# Formato columnar (.parquet), escrito por data/set_to_csv.py: una columna Timestamp
+# (float64) y una columna entera por canal (int16 o int32, comprimidas con zstd).
+# La frecuencia de muestreo y los canales se guardan como JSON en los metadatos del
+# esquema, así que se conocen leyendo sólo el pie del archivo, y cada canal se puede
+# leer sin tocar los demás. Requiere pyarrow.
+PARQUET_EXT = '.parquet'
+PARQUET_METADATA_KEY = b'neurodac'
+PARQUET_COMPRESSION = 'zstd'
+
+
+def import_pyarrow():
+    """
+    Importar pyarrow (dependencia opcional, sólo para el formato .parquet).
+    :return: Tupla (pyarrow, pyarrow.parquet).
+    :raises ImportError: Si pyarrow no está instalado.
+    """
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("El formato .parquet requiere pyarrow (pip install pyarrow).") from e
+    return pyarrow, pyarrow.parquet
+
+
+def read_parquet_header(path):
+    """
+    Leer los metadatos de una grabación .parquet sin leer sus columnas.
+    :param path: Ruta del archivo .parquet.
+    :return: Tupla (metadata, n_rows); metadata incluye 'channels' y 'sfreq'.
+    """
+    _, pq = import_pyarrow()
+    parquet_file = pq.ParquetFile(path)
+    schema = parquet_file.schema_arrow
+    raw_meta = (schema.metadata or {}).get(PARQUET_METADATA_KEY)
+    metadata = json.loads(raw_meta.decode('utf-8')) if raw_meta else {}
+    metadata.setdefault('channels', [name for name in schema.names if name != 'Timestamp'])
+    metadata.setdefault('sfreq', None)
+    return metadata, parquet_file.metadata.num_rows
+
+
+def read_parquet_columns(path, columns):
+    """
+    Leer sólo algunas columnas de una grabación .parquet.
+    :param path: Ruta del archivo .parquet.
+    :param columns: Lista de nombres de columna.
+    :return: Diccionario {columna: arreglo de NumPy}.
+    """
+    _, pq = import_pyarrow()
+    table = pq.read_table(path, columns=list(columns))
+    return {name: table.column(name).to_numpy() for name in columns}
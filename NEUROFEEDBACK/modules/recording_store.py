@@ -0,0 +1,336 @@
+import json
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+from modules.recording import (
+    open_recording, read_stream, read_parquet_header, read_parquet_columns, RECORDING_EXT, PARQUET_EXT,
+)
+
+STORE_EXT = '.store'
+STORE_VERSION = 1
+STATS_FILE = 'stats.npz'
+CSV_CHUNK_ROWS = 65536  # Filas por bloque al convertir un CSV
+DEFAULT_SFREQ = 512
+
+
+class RecordingStore:
+    """
+    Grabación convertida una sola vez a un arreglo (canales x muestras) float32
+    en disco, que se abre mapeado en memoria.
+
+    La primera vez que se abre un CSV o un .ndr se convierte por bloques a
+    <archivo>.store/data.npy (un canal por fila, así cada canal es contiguo) con
+    un meta.json; las siguientes aperturas sólo leen el encabezado, de modo que
+    el arranque no depende del tamaño de la grabación y en memoria residente
+    sólo quedan las páginas de los canales y ventanas que se consultan. Si el
+    archivo original cambia de tamaño o fecha, se vuelve a convertir.
+
+    Un .parquet no se convierte completo: se reserva el arreglo y cada canal se
+    lee de su columna la primera vez que se pide (picks(), channel(), window()),
+    así que abrir una grabación de 64 canales para ver uno lee 1/64 de los datos.
+    La pirámide mín/máx y las estadísticas guardadas sólo se construyen cuando
+    todos los canales están cargados.
+    """
+
+    def __init__(self, path, sfreq=DEFAULT_SFREQ):
+        """
+        :param path: Ruta de la grabación (CSV con Timestamp y canales o Timestamp,Signal,Value,
+                     .ndr o .parquet).
+        :param sfreq: Frecuencia de muestreo si el archivo no la indica.
+        """
+        self.path = path
+        self.directory = path + STORE_EXT
+        meta = self.load_meta()
+        if meta is None:
+            meta = self.convert(sfreq)
+        self.channels = meta['channels']
+        self.sfreq = meta['sfreq'] or sfreq
+        self.n_samples = meta['n_samples']
+        data = np.load(os.path.join(self.directory, 'data.npy'), mmap_mode='r')
+        self.data = data[:, :self.n_samples]
+        self.index = {ch: i for i, ch in enumerate(self.channels)}
+        # Canales ya escritos en data.npy (None: todos, el caso de CSV y .ndr)
+        self.loaded = set(meta['loaded']) if 'loaded' in meta else None
+        self.lock = threading.Lock()
+        self._pyramid = None
+        self._pyramid_thread = None
+        self._stats = None
+
+    # --- Conversión y validación del caché ---
+    def source_info(self):
+        stat = os.stat(self.path)
+        return {'size': stat.st_size, 'mtime': stat.st_mtime}
+
+    def load_meta(self):
+        """Metadatos del caché, o None si no existe o ya no corresponde al archivo."""
+        meta_path = os.path.join(self.directory, 'meta.json')
+        if not os.path.exists(meta_path):
+            return None
+        try:
+            with open(meta_path) as fh:
+                meta = json.load(fh)
+        except (OSError, ValueError) as e:
+            print(f"Caché inválido en {self.directory}, se vuelve a convertir: {e}")
+            return None
+        if meta.get('version') != STORE_VERSION or meta.get('source') != self.source_info():
+            return None
+        return meta
+
+    def convert(self, sfreq):
+        """
+        Convertir la grabación original al arreglo mapeado en memoria.
+        :return: Metadatos del caché.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        data_path = os.path.join(self.directory, 'data.npy')
+        # Archivo temporal propio: dos conversiones a la vez (hilos o procesos que
+        # comparten el directorio de datos) no escriben ni renombran el mismo archivo
+        fd, tmp_path = tempfile.mkstemp(prefix='data.', suffix='.tmp.npy', dir=self.directory)
+        os.close(fd)
+
+        lazy = self.path.lower().endswith(PARQUET_EXT)
+        try:
+            if lazy:
+                channels, n_samples, sfreq = self.reserve_parquet(tmp_path, sfreq)
+            elif self.path.lower().endswith(RECORDING_EXT):
+                channels, n_samples, sfreq = self.convert_recording(tmp_path, sfreq)
+            else:
+                channels, n_samples = self.convert_csv(tmp_path)
+            os.replace(tmp_path, data_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        # Las estadísticas guardadas corresponden a la conversión anterior
+        try:
+            os.remove(os.path.join(self.directory, STATS_FILE))
+        except FileNotFoundError:
+            pass
+
+        meta = {
+            'version': STORE_VERSION,
+            'source': self.source_info(),
+            'channels': channels,
+            'sfreq': sfreq,
+            'n_samples': n_samples,
+        }
+        if lazy:
+            meta['loaded'] = []
+        # meta.json se escribe al final: sin él el caché se considera incompleto
+        self.write_meta(meta)
+        return meta
+
+    def write_meta(self, meta):
+        """Escribir meta.json de forma atómica."""
+        meta_path = os.path.join(self.directory, 'meta.json')
+        fd, tmp_path = tempfile.mkstemp(prefix='meta.', suffix='.tmp', dir=self.directory)
+        with os.fdopen(fd, 'w') as fh:
+            json.dump(meta, fh)
+        os.replace(tmp_path, meta_path)
+
+    def convert_csv(self, out_path):
+        """
+        Convierte un CSV por bloques de CSV_CHUNK_ROWS filas. Un CSV multiflujo
+        (Timestamp,Signal,Value) se trata como un .ndr multiflujo: se toman las filas
+        de raw o, si no hay, de la primera señal que aparece.
+        """
+        import pandas as pd
+
+        # Contar filas sin parsear para reservar el arreglo de salida
+        n_rows = 0
+        last = b'\n'
+        with open(self.path, 'rb') as fh:
+            for block in iter(lambda: fh.read(1 << 20), b''):
+                n_rows += block.count(b'\n')
+                last = block[-1:]
+        n_rows += last != b'\n'
+        n_rows = max(n_rows - 1, 0)  # Encabezado
+
+        reader = pd.read_csv(self.path, chunksize=CSV_CHUNK_ROWS)
+        out = None
+        channels = []
+        signal = None  # Señal que se toma de un CSV multiflujo
+        filled = 0
+        for chunk in reader:
+            chunk.columns = chunk.columns.str.strip()
+            chunk = chunk.rename(columns={"git Timestamp": "Timestamp"})
+            if out is None:
+                channels = chunk.columns.drop('Timestamp').tolist()
+                if channels == ['Signal', 'Value']:
+                    signals = chunk['Signal'].astype(str).str.strip().unique().tolist()
+                    signal = 'raw' if 'raw' in signals else signals[0]
+                    channels = [signal.capitalize()]
+                out = np.lib.format.open_memmap(out_path, mode='w+', dtype=np.float32, shape=(len(channels), n_rows))
+            if signal is not None:
+                chunk = chunk.loc[chunk['Signal'].astype(str).str.strip() == signal, ['Value']]
+                chunk.columns = channels
+            values = chunk[channels].to_numpy(dtype=np.float32)
+            out[:, filled:filled + len(values)] = values.T
+            filled += len(values)
+
+        if out is None:
+            raise ValueError(f"El archivo {self.path} no contiene datos.")
+        out.flush()
+        del out
+        # Las líneas vacías (y las de otras señales) no cuentan como muestras; n_samples marca las válidas
+        return channels, filled
+
+    def convert_recording(self, out_path, sfreq):
+        """Convierte una grabación .ndr (de una grabación multiflujo se toma raw o la primera señal)."""
+        metadata, records = open_recording(self.path)
+        if 'Stream' in records.dtype.names:
+            signals = metadata['signals']
+            signal = 'raw' if 'raw' in signals else signals[0]
+            channels = [signal.capitalize()]
+            columns = [read_stream(metadata, records, signal)[1]]
+        else:
+            channels = [name for name in records.dtype.names if name != 'Timestamp']
+            columns = [records[ch] for ch in channels]
+
+        out = np.lib.format.open_memmap(out_path, mode='w+', dtype=np.float32, shape=(len(channels), len(columns[0])))
+        for i, column in enumerate(columns):
+            out[i] = column
+        out.flush()
+        del out
+        return channels, len(columns[0]), metadata.get('sfreq') or sfreq
+
+    def reserve_parquet(self, out_path, sfreq):
+        """Reservar el arreglo de un .parquet sin leer sus columnas (se llenan con require())."""
+        metadata, n_samples = read_parquet_header(self.path)
+        channels = metadata['channels']
+        out = np.lib.format.open_memmap(out_path, mode='w+', dtype=np.float32, shape=(len(channels), n_samples))
+        del out
+        return channels, n_samples, metadata['sfreq'] or sfreq
+
+    def require(self, picks):
+        """
+        Asegurar que los canales `picks` están en data.npy, leyendo del .parquet
+        sólo las columnas que falten.
+        :param picks: Índices de canal.
+        """
+        if self.loaded is None:
+            return
+        with self.lock:
+            missing = sorted(set(picks) - self.loaded)
+            if not missing:
+                return
+            columns = read_parquet_columns(self.path, [self.channels[i] for i in missing])
+            out = np.load(os.path.join(self.directory, 'data.npy'), mmap_mode='r+')
+            for ch_idx in missing:
+                out[ch_idx, :self.n_samples] = columns[self.channels[ch_idx]]
+            out.flush()
+            del out
+            self.loaded.update(missing)
+            meta = self.load_meta()
+            if meta is not None:
+                meta['loaded'] = sorted(self.loaded)
+                self.write_meta(meta)
+
+    @property
+    def complete(self):
+        """Indica si todos los canales están cargados en data.npy."""
+        return self.loaded is None or len(self.loaded) == len(self.channels)
+
+    # --- Acceso ---
+    @property
+    def duration(self):
+        """Duración de la grabación en segundos."""
+        return self.n_samples / self.sfreq
+
+    @property
+    def pyramid(self):
+        """
+        Pirámide mín/máx de la grabación (se abre o construye la primera vez que se pide).
+        Necesita todos los canales: en un .parquet parcialmente cargado los lee todos.
+        """
+        if self._pyramid is None:
+            self.require(range(len(self.channels)))
+            from modules.pyramid import MinMaxPyramid
+            self._pyramid = MinMaxPyramid.load_or_build(self.path, self.data)
+        return self._pyramid
+
+    def ready_pyramid(self):
+        """
+        Pirámide mín/máx si ya está disponible. La primera vez que se pide se abre
+        o construye en un hilo en segundo plano y, mientras tanto, regresa None
+        (quien grafica decima la ventana), así que no bloquea la primera gráfica.
+        """
+        if self._pyramid is not None:
+            return self._pyramid
+        with self.lock:
+            if self._pyramid_thread is None:
+                self._pyramid_thread = threading.Thread(target=self.build_pyramid, daemon=True)
+                self._pyramid_thread.start()
+        return None
+
+    def build_pyramid(self):
+        """Abrir o construir la pirámide (hilo de ready_pyramid())."""
+        try:
+            self.pyramid
+        except (OSError, ValueError, MemoryError) as e:
+            print(f"No se pudo construir la pirámide de {self.path}: {e}")
+
+    @property
+    def stats(self):
+        """
+        Estadísticas por canal y por bloque (ChannelStats). Se abren del caché de
+        la grabación si existen; si no, cada canal se calcula la primera vez que se
+        pide y el caché se escribe cuando ya están calculados todos.
+        """
+        if self._stats is None:
+            from modules.channel_stats import ChannelStats, STATS_BLOCK_SECONDS
+            path = os.path.join(self.directory, STATS_FILE)
+            stats = ChannelStats(
+                self.channel_data, len(self.channels), int(self.sfreq * STATS_BLOCK_SECONDS),
+                on_complete=lambda complete_stats: self.save_stats(complete_stats, path)
+            )
+            if os.path.exists(path):
+                try:
+                    stats.load(path)
+                except (OSError, ValueError, KeyError) as e:
+                    print(f"Estadísticas inválidas en {path}, se recalculan: {e}")
+            self._stats = stats
+        return self._stats
+
+    def save_stats(self, stats, path):
+        """Guardar en el caché unas estadísticas con todos los canales calculados."""
+        try:
+            stats.save(path)
+        except OSError as e:
+            print(f"No se pudieron guardar las estadísticas en {path}: {e}")
+
+    def picks(self, names):
+        """
+        Índices de varios canales, cargándolos si hace falta.
+        :param names: Lista de nombres de canal.
+        :return: Lista de índices.
+        """
+        picks = [self.index[name] for name in names]
+        self.require(picks)
+        return picks
+
+    def channel_data(self, ch_idx):
+        """Señal completa de un canal por índice (vista sobre el archivo mapeado)."""
+        self.require([ch_idx])
+        return self.data[ch_idx]
+
+    def channel(self, name, start=None, stop=None):
+        """
+        Rebanada de un canal sin copiar (vista sobre el archivo mapeado).
+        :param name: Nombre del canal.
+        :param start: Primera muestra.
+        :param stop: Muestra final (exclusiva).
+        """
+        return self.channel_data(self.index[name])[start:stop]
+
+    def window(self, picks, start=None, stop=None):
+        """
+        Ventana de varios canales (se copian sólo las muestras pedidas).
+        :param picks: Lista de índices de canal.
+        :return: Arreglo (canales x muestras).
+        """
+        self.require(picks)
+        return self.data[picks, start:stop]
@@ -0,0 +1,98 @@
+import numpy as np
+
+
+class RingBuffer:
+    """
+    Búfer circular de capacidad fija respaldado por arreglos de NumPy (valores y tiempos).
+
+    Internamente hay `size` = capacity + 1 posiciones y cada muestra se escribe dos
+    veces, en la posición i y en i + size, de modo que cualquier ventana con las
+    últimas n <= capacity muestras es un bloque contiguo del arreglo y puede
+    entregarse como vista sin copiar.
+
+    Está pensado para un único hilo productor (el que llama a append) y cualquier
+    número de lectores sin candados: el contador `head` se publica después de escribir
+    los datos, y la posición extra hace que la siguiente escritura nunca caiga dentro
+    de una ventana de `capacity` muestras, así que un lector que copia una ventana
+    mientras llega la muestra siguiente no ve una muestra a medio escribir ni fuera
+    de orden.
+    """
+
+    def __init__(self, capacity, dtype=np.float64):
+        """
+        Inicializa el búfer.
+        :param capacity: Número máximo de muestras que se conservan.
+        :param dtype: Tipo de dato de los valores.
+        """
+        capacity = int(capacity)
+        if capacity <= 0:
+            raise ValueError("La capacidad del búfer debe ser mayor que cero.")
+        self.capacity = capacity
+        self.size = capacity + 1  # Una posición de holgura para la siguiente escritura
+        self.values = np.zeros(2 * self.size, dtype=dtype)
+        self.timestamps = np.zeros(2 * self.size, dtype=np.float64)
+        self.head = 0  # Total de muestras escritas desde la creación (sólo crece)
+
+    def __len__(self):
+        return min(self.head, self.capacity)
+
+    def append(self, timestamp, value):
+        """
+        Agregar una muestra (sólo desde el hilo productor).
+        :param timestamp: Tiempo de llegada de la muestra.
+        :param value: Valor de la muestra.
+        """
+        i = self.head % self.size
+        j = i + self.size
+        self.values[i] = value
+        self.values[j] = value
+        self.timestamps[i] = timestamp
+        self.timestamps[j] = timestamp
+        self.head += 1
+
+    def view(self, n=None):
+        """
+        Obtener las últimas n muestras como vistas contiguas, sin copiar.
+        Las vistas apuntan a la memoria del búfer: el productor las sobrescribe después
+        de escribir capacity + 1 - n muestras nuevas. Usar snapshot() para conservarlas.
+        :param n: Número de muestras (por defecto, todas las disponibles).
+        :return: Tupla (timestamps, values) de arreglos de NumPy.
+        """
+        head = self.head
+        available = min(head, self.capacity)
+        n = available if n is None else max(0, min(int(n), available))
+        end = head % self.size + self.size
+        return self.timestamps[end - n:end], self.values[end - n:end]
+
+    def snapshot(self, n=None):
+        """
+        Obtener una copia de las últimas n muestras.
+        :param n: Número de muestras (por defecto, todas las disponibles).
+        :return: Tupla (timestamps, values) de arreglos de NumPy independientes del búfer.
+        """
+        timestamps, values = self.view(n)
+        return timestamps.copy(), values.copy()
+
+    def read_since(self, cursor, max_n=None):
+        """
+        Leer las muestras escritas desde `cursor`, para lectores que consumen el flujo
+        a su propio ritmo sin sacar muestras del búfer (cada uno con su cursor).
+        Si el lector se atrasó más de `capacity` muestras, las más antiguas ya se
+        sobrescribieron y se omiten.
+        :param cursor: Posición regresada por la lectura anterior (o `head` al empezar).
+        :param max_n: Máximo de muestras a regresar (se conservan las más recientes).
+        :return: Tupla (timestamps, values, cursor) con copias de las muestras nuevas y
+                 la posición para la siguiente lectura.
+        """
+        head = self.head
+        if cursor > head:  # El búfer se vació con clear()
+            cursor = 0
+        n = min(head - cursor, self.capacity)
+        if max_n is not None:
+            n = max(0, min(n, int(max_n)))
+        end = head % self.size + self.size
+        return self.timestamps[end - n:end].copy(), self.values[end - n:end].copy(), head
+
+    def clear(self):
+        """Descartar todas las muestras."""
+        self.head = 0
@@ -5,9 +5,6 @@
 
 import os
 import sys
-import time
-import threading
-from collections import deque
 
 import dash
 from dash import html, dcc, Input, Output, State, no_update
@@ -20,14 +17,14 @@ parent_dir = os.path.dirname(current_dir)
 if parent_dir not in sys.path:
     sys.path.append(parent_dir)
 
-from modules.neurosky_data_collector import NeuroSkyDataCollector, validate_signal_type
+from modules import acquisition_hub
+from modules.neurosky_data_collector import validate_signal_type
+from modules.plot_utils import get_colors as gc, line_trace
 
-LIVE_DATA_BUFFER_C1 = deque()
-COLLECTOR_C1 = None
-THREAD_C1 = None
-LIVE_DATA_BUFFER_C2 = deque()
-COLLECTOR_C2 = None
-THREAD_C2 = None
+# Lectores de cada jugador; con el mismo puerto ambos comparten la diadema (acquisition_hub)
+SUBSCRIPTION_C1 = None
+SUBSCRIPTION_C2 = None
+MAX_POINTS = 512  # Puntos visibles en cada gráfica en vivo
 dash.register_page(__name__, path="/carrera")
 
 SIGS = [
@@ -45,19 +42,11 @@ SIGS = [
     'mid-gamma']
 
 
-def gc(theme):
-    if theme == 'dark':
-        return {'bg': '#222', 'paper': '#222', 'font': '#fff',
-                'grid': 'rgba(255,255,255,0.08)', 'zero': 'rgba(255,255,255,0.2)', 'trace': '#4DA8DA'}
-    return {'bg': '#fff', 'paper': '#fff', 'font': '#212529',
-            'grid': 'rgba(0,0,0,0.06)', 'zero': 'rgba(0,0,0,0.15)', 'trace': '#375a7f'}
-
-
 def empty_fig(st, theme, title="Esperando..."):
     c = gc(theme)
     yr = [0, 100] if st in ['attention', 'meditation'] else (
         [-2048, 2048] if st == 'raw' else None)
-    return go.Figure(data=[go.Scatter(y=[], mode='lines', line=dict(color=c['trace'], width=1.5))],
+    return go.Figure(data=[line_trace(y=[], n_points=MAX_POINTS, line=dict(color=c['trace'], width=1.5))],
                      layout=go.Layout(title=dict(text=title, font=dict(size=11)),
                                       xaxis=dict(title='Tiempo (s)', gridcolor=c['grid']),
                                       yaxis=dict(
@@ -66,15 +55,6 @@ def empty_fig(st, theme, title="Esperando..."):
         font=dict(family="Outfit", color=c['font'], size=10), margin=dict(t=30, l=40, r=15, b=30)))
 
 
-def collect_buf(ci, buf):
-    while ci.running:
-        try:
-            buf.append(ci.get_signal_value(ci.signal_type))
-            time.sleep(1.0 / ci.sample_freq)
-        except BaseException:
-            pass
-
-
 RACE_HTML = """<!DOCTYPE html><html><head><style>
 *{margin:0;padding:0;box-sizing:border-box}
 body{overflow:hidden;font-family:'Outfit',sans-serif}
@@ -228,7 +208,7 @@ layout = html.Div(className='page-content', children=[
                             dbc.Label("Puerto:", style={"fontSize": "0.78rem"}),
                             dbc.Input(
                                 id="rt-com-port-c1",
-                                placeholder="COM3",
+                                placeholder="COM3 o sim",
                                 type="text",
                                 size="sm",
                                 className="mb-1"),
@@ -266,7 +246,7 @@ layout = html.Div(className='page-content', children=[
                             dbc.Label("Puerto:", style={"fontSize": "0.78rem"}),
                             dbc.Input(
                                 id="rt-com-port-c2",
-                                placeholder="COM4",
+                                placeholder="COM4 o sim",
                                 type="text",
                                 size="sm",
                                 className="mb-1"),
@@ -323,7 +303,7 @@ layout = html.Div(className='page-content', children=[
                Input('rt-connect-c1', 'n_clicks'), Input('rt-stop-c1', 'n_clicks'),
                State('rt-com-port-c1', 'value'), State('rt-signal-type-c1', 'value'), State('theme-store', 'data'), prevent_initial_call=True)
 def m_c1(cc, sc, port, st, theme):
-    global COLLECTOR_C1, THREAD_C1
+    global SUBSCRIPTION_C1
     tid = dash.ctx.triggered_id
     if tid == 'rt-connect-c1':
         if not port:
@@ -334,32 +314,22 @@ def m_c1(cc, sc, port, st, theme):
         except ValueError as e:
             return html.Span(
                 str(e), className="status-badge disconnected"), True, empty_fig(st, theme, "Error")
-        if COLLECTOR_C1 and COLLECTOR_C1.running:
-            COLLECTOR_C1.stop()
-            if THREAD_C1 and THREAD_C1.is_alive():
-                THREAD_C1.join()
-        LIVE_DATA_BUFFER_C1.clear()
+        # La suscripción anterior se cancela después de la nueva (misma diadema: no se reabre el puerto)
+        prev, SUBSCRIPTION_C1 = SUBSCRIPTION_C1, None
         try:
-            COLLECTOR_C1 = NeuroSkyDataCollector(port=port, signal_type=st, save_to_csv=False)
-            COLLECTOR_C1.connect()
-            COLLECTOR_C1.running = True
-            THREAD_C1 = threading.Thread(
-                target=collect_buf, args=(
-                    COLLECTOR_C1, LIVE_DATA_BUFFER_C1), daemon=True)
-            THREAD_C1.start()
+            SUBSCRIPTION_C1 = acquisition_hub.subscribe(port, st)
             return html.Span([html.Span(
                 className="dot"), f" {port}"], className="status-badge connected"), False, empty_fig(st, theme, f"J1: {st}")
         except Exception as e:
-            if COLLECTOR_C1:
-                COLLECTOR_C1.running = False
             return html.Span(
                 f"Error: {e}", className="status-badge disconnected"), True, empty_fig(st, theme, "Error")
+        finally:
+            if prev:
+                prev.close()
     elif tid == 'rt-stop-c1':
-        if COLLECTOR_C1 and COLLECTOR_C1.running:
-            COLLECTOR_C1.stop()
-            if THREAD_C1 and THREAD_C1.is_alive():
-                THREAD_C1.join()
-            LIVE_DATA_BUFFER_C1.clear()
+        if SUBSCRIPTION_C1:
+            SUBSCRIPTION_C1.close()
+            SUBSCRIPTION_C1 = None
             return html.Span(
                 "Stop.", className="status-badge disconnected"), True, empty_fig(st, theme, "J1: Stop")
         return html.Span(
@@ -370,15 +340,12 @@ def m_c1(cc, sc, port, st, theme):
 @dash.callback(Output('rt-graph-c1', 'extendData'), Output('carrera-signal-store', 'data'), Output('carrera-signal-value', 'children'),
                Input('rt-interval-c1', 'n_intervals'), prevent_initial_call=True)
 def u_c1(n):
-    pts = []
-    while True:
-        try:
-            pts.append(LIVE_DATA_BUFFER_C1.popleft())
-        except BaseException:
-            break
-    if not pts:
+    if SUBSCRIPTION_C1 is None:
+        return no_update, no_update, no_update
+    _, pts = SUBSCRIPTION_C1.read(MAX_POINTS)
+    if not len(pts):
         return no_update, no_update, no_update
-    return ({'y': [pts]}, [0], 512), int(pts[-1]), str(int(pts[-1]))
+    return ({'y': [pts.tolist()]}, [0], MAX_POINTS), int(pts[-1]), str(int(pts[-1]))
 
 # --- Callbacks J2 ---
 
@@ -387,7 +354,7 @@ def u_c1(n):
                Input('rt-connect-c2', 'n_clicks'), Input('rt-stop-c2', 'n_clicks'),
                State('rt-com-port-c2', 'value'), State('rt-signal-type-c2', 'value'), State('theme-store', 'data'), prevent_initial_call=True)
 def m_c2(cc, sc, port, st, theme):
-    global COLLECTOR_C2, THREAD_C2
+    global SUBSCRIPTION_C2
     tid = dash.ctx.triggered_id
     if tid == 'rt-connect-c2':
         if not port:
@@ -398,32 +365,22 @@ def m_c2(cc, sc, port, st, theme):
         except ValueError as e:
             return html.Span(
                 str(e), className="status-badge disconnected"), True, empty_fig(st, theme, "Error")
-        if COLLECTOR_C2 and COLLECTOR_C2.running:
-            COLLECTOR_C2.stop()
-            if THREAD_C2 and THREAD_C2.is_alive():
-                THREAD_C2.join()
-        LIVE_DATA_BUFFER_C2.clear()
+        # La suscripción anterior se cancela después de la nueva (misma diadema: no se reabre el puerto)
+        prev, SUBSCRIPTION_C2 = SUBSCRIPTION_C2, None
         try:
-            COLLECTOR_C2 = NeuroSkyDataCollector(port=port, signal_type=st, save_to_csv=False)
-            COLLECTOR_C2.connect()
-            COLLECTOR_C2.running = True
-            THREAD_C2 = threading.Thread(
-                target=collect_buf, args=(
-                    COLLECTOR_C2, LIVE_DATA_BUFFER_C2), daemon=True)
-            THREAD_C2.start()
+            SUBSCRIPTION_C2 = acquisition_hub.subscribe(port, st)
             return html.Span([html.Span(
                 className="dot"), f" {port}"], className="status-badge connected"), False, empty_fig(st, theme, f"J2: {st}")
         except Exception as e:
-            if COLLECTOR_C2:
-                COLLECTOR_C2.running = False
             return html.Span(
                 f"Error: {e}", className="status-badge disconnected"), True, empty_fig(st, theme, "Error")
+        finally:
+            if prev:
+                prev.close()
     elif tid == 'rt-stop-c2':
-        if COLLECTOR_C2 and COLLECTOR_C2.running:
-            COLLECTOR_C2.stop()
-            if THREAD_C2 and THREAD_C2.is_alive():
-                THREAD_C2.join()
-            LIVE_DATA_BUFFER_C2.clear()
+        if SUBSCRIPTION_C2:
+            SUBSCRIPTION_C2.close()
+            SUBSCRIPTION_C2 = None
             return html.Span(
                 "Stop.", className="status-badge disconnected"), True, empty_fig(st, theme, "J2: Stop")
         return html.Span(
@@ -434,15 +391,12 @@ def m_c2(cc, sc, port, st, theme):
 @dash.callback(Output('rt-graph-c2', 'extendData'),
                Input('rt-interval-c2', 'n_intervals'), prevent_initial_call=True)
 def u_c2(n):
-    pts = []
-    while True:
-        try:
-            pts.append(LIVE_DATA_BUFFER_C2.popleft())
-        except BaseException:
-            break
-    if not pts:
+    if SUBSCRIPTION_C2 is None:
+        return no_update
+    _, pts = SUBSCRIPTION_C2.read(MAX_POINTS)
+    if not len(pts):
         return no_update
-    return ({'y': [pts]}, [0], 512)
+    return ({'y': [pts.tolist()]}, [0], MAX_POINTS)
 
 
 # Send signal + theme to iframe, and forward keyboard events
@@ -3,49 +3,56 @@
 # con filtrado por bandas, reproducción automática y panel educativo.
 
 import dash
-from dash import dcc, html, Input, Output, State, no_update, callback_context
+from dash import dcc, html, Input, Output, State, Patch, no_update, callback_context
 import dash_bootstrap_components as dbc
-import pandas as pd
 import plotly.graph_objs as go
-import mne
 import os
+import sys
+import time
 import numpy as np
 
+# Agregar directorio raíz al path para importar módulos
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+from modules.dataset_cache import DatasetCache, find_recordings
+from modules.decimation import decimate
+from modules.plot_utils import get_colors, line_trace, typed_array, use_webgl
+
 dash.register_page(
     __name__, path="/",
     name="Visualización EEG",
     redirect_from=["/grafica"]
 )
 
+
 # =============================================================
 # Carga de datos
 # =============================================================
-csv_path = os.path.join(
-    os.path.dirname(__file__), "..", "data",
-    "sub-hc1_ses-hc_task-rest_eeg_clean.csv"
-    #"sub-hc1_ses-hc_task-rest_eeg_maestro.csv"
-    #"data.csv"
-)
-df = pd.read_csv(csv_path)
-df.columns = df.columns.str.strip()
-df.rename(columns={"git Timestamp": "Timestamp"}, inplace=True)
+# Grabaciones disponibles: todos los CSV, .ndr y .parquet del directorio de datos
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
+recording_options = find_recordings(DATA_DIR)
+DEFAULT_RECORDING = "sub-hc1_ses-hc_task-rest_eeg_clean.csv"
+if DEFAULT_RECORDING not in recording_options and recording_options:
+    DEFAULT_RECORDING = recording_options[0]
+
+# Frecuencia de muestreo si la grabación no la indica
+SAMPLE_RATE = 512
 
-# Lista de canales disponibles (todas las columnas excepto Timestamp)
-signal_options = df.columns.drop('Timestamp').tolist()
-DEFAULT_SIGNAL = signal_options[0]  # Primer canal como default
+# Puntos por trazo tras la decimación (~ancho en píxeles de la gráfica;
+# la envolvente mín/máx usa dos puntos por píxel)
+PLOT_POINTS = 2000
 
-# Parámetros de muestreo
-SAMPLE_RATE = 512
-MAX_DURATION = int(len(df) / SAMPLE_RATE)
-
-# Crear objeto RawArray de MNE para filtrado
-data_np = df[signal_options].to_numpy().T
-info = mne.create_info(
-    ch_names=signal_options,
-    sfreq=SAMPLE_RATE,
-    ch_types=['eeg'] * len(signal_options)
-)
-raw = mne.io.RawArray(data_np, info)
+# Reproducción en el navegador: segundos por bloque enviado al cliente (como
+# mínimo tres ventanas, para que precargar el siguiente bloque dé tiempo)
+PLAYBACK_CHUNK_SECONDS = 30
+
+# Vista multicanal: los canales se apilan en un solo eje Y y se agrupan en este
+# número de trazas (una por color), separando canales con NaN
+MONTAGE_COLORS = 10
+MONTAGE_HALF_HEIGHT = 0.45  # Media altura de cada canal (la separación es 1)
 
 # =============================================================
 # Contenido educativo (divulgativo, en Times New Roman)
@@ -106,8 +113,9 @@ VINFO = {
     ),
     'multi': (
         'Vista multicanal',
-        'Montaje vertical como en un electroencefalógrafo clínico. Cada canal '
-        'con su propio color para distinguir regiones cerebrales.'
+        'Montaje vertical como en un electroencefalógrafo clínico: cada canal '
+        'en su propio renglón, desplazado y escalado a su amplitud, con su '
+        'nombre en el eje vertical y al pasar el cursor.'
     ),
     'superpuesta': (
         'Vista superpuesta',
@@ -125,33 +133,141 @@ BANDS = {
     'gamma': (30, 50),
 }
 
+# Grabaciones abiertas (LRU): cada una se convierte una sola vez a un arreglo
+# mapeado en memoria y conserva sus canales filtrados por banda
+datasets = DatasetCache(DATA_DIR, BANDS, sfreq=SAMPLE_RATE)
+
+# Grabación inicial (los demás se cargan al elegirlos en el selector)
+default_store = datasets.get(DEFAULT_RECORDING).store
+signal_options = default_store.channels
+DEFAULT_SIGNAL = signal_options[0]  # Primer canal como default
+MAX_DURATION = int(default_store.duration)
+
 
 # =============================================================
 # Funciones auxiliares
 # =============================================================
-def get_colors(theme):
-    """Retorna colores de gráfica según el tema activo."""
-    if theme == 'dark':
-        return {
-            'bg': '#222', 'paper': '#222', 'font': '#fff',
-            'grid': 'rgba(255,255,255,0.08)',
-            'zero': 'rgba(255,255,255,0.2)',
-        }
-    return {
-        'bg': '#fff', 'paper': '#fff', 'font': '#212529',
-        'grid': 'rgba(0,0,0,0.06)',
-        'zero': 'rgba(0,0,0,0.15)',
-    }
+def slider_marks(duration):
+    """Marcas del selector de rango de tiempo para una duración en segundos."""
+    return {i: f'{i}s' for i in range(0, duration + 1, max(30, int(duration / 5)))}
 
 
-def symmetric_yrange(data, padding=1.1):
-    """Calcula un rango Y simétrico centrado en 0."""
-    if len(data) == 0:
-        return [-500, 500]
-    max_abs = max(abs(np.min(data)), abs(np.max(data)))
-    if max_abs == 0:
-        return [-100, 100]
-    return [-max_abs * padding, max_abs * padding]
+def select_traces(store, view_mode, signal, channels, filter_band):
+    """
+    Canales a graficar según la vista, ignorando los que no existen en la grabación.
+    :return: Tupla (canales, banda); las vistas multicanal y superpuesta no se filtran.
+    """
+    default_signal = store.channels[0]
+    if view_mode == 'única':
+        return [signal if signal in store.index else default_signal], filter_band
+    channels = [ch for ch in (channels or []) if ch in store.index]
+    return (channels if channels else [default_signal]), 'none'
+
+
+def plot_window(recording, picks, start_idx, end_idx, resolution, band='none', n_out=PLOT_POINTS):
+    """
+    Ventana de señal lista para graficar: (x en segundos, y canales x puntos).
+    Con la envolvente mín/máx y sin filtro se lee el nivel adecuado de la
+    pirámide, así que el costo no depende de la duración de la ventana; en los
+    demás casos (mientras la pirámide se construye en segundo plano o un
+    .parquet no tenga todos sus canales cargados) se decima la ventana completa.
+    """
+    sfreq = recording.store.sfreq
+    pyramid = None
+    if resolution == 'minmax' and band not in BANDS and recording.store.complete:
+        pyramid = recording.store.ready_pyramid()
+    if pyramid is not None:
+        window = pyramid.query(picks, start_idx, end_idx, n_out // 2)
+        if window is not None:
+            x, y = window
+            return np.broadcast_to(x / sfreq, y.shape), y
+
+    y = np.stack([recording.filters.get(band, ch_idx)[start_idx:end_idx] for ch_idx in picks])
+    times = np.arange(start_idx, start_idx + y.shape[1]) / sfreq
+    return decimate(times, y, resolution, n_out)
+
+
+def montage_groups(n_channels):
+    """Índices de canal de cada traza del montaje (el canal i va en la traza i % MONTAGE_COLORS)."""
+    return [list(range(g, n_channels, MONTAGE_COLORS)) for g in range(min(MONTAGE_COLORS, n_channels))]
+
+
+def montage_offsets(y_plot, limits):
+    """
+    Escalar cada canal a ±MONTAGE_HALF_HEIGHT según su amplitud de referencia y
+    desplazarlo a su renglón (el primer canal queda arriba).
+    :param y_plot: Arreglo (canales x puntos).
+    :param limits: Amplitud de referencia por canal (de ChannelStats.limits).
+    """
+    n = len(y_plot)
+    limits = np.where(np.isnan(limits) | (limits == 0), 1.0, limits)
+    offsets = (n - 1 - np.arange(n))[:, np.newaxis]
+    y = y_plot * (MONTAGE_HALF_HEIGHT / limits)[:, np.newaxis] + offsets
+    return y.astype(np.float32, copy=False)
+
+
+def montage_traces(x_plot, y_montage, names):
+    """
+    Agrupar los canales apilados en MONTAGE_COLORS trazas, con un NaN después de
+    cada canal para que plotly no una el final de uno con el inicio del siguiente.
+    :param names: Nombre de cada canal (se repite en customdata para el hover).
+    :return: Listas (xs, ys, customdata) con un arreglo por traza.
+    """
+    n, n_points = y_montage.shape
+    gap = np.full((n, 1), np.nan)
+    x = np.concatenate([np.broadcast_to(x_plot, y_montage.shape), gap], axis=1)
+    y = np.concatenate([y_montage, gap.astype(y_montage.dtype)], axis=1)
+    names = np.asarray(names, dtype=object)
+    groups = montage_groups(n)
+    return (
+        [x[rows].ravel() for rows in groups],
+        [y[rows].ravel() for rows in groups],
+        [np.repeat(names[rows], n_points + 1) for rows in groups],
+    )
+
+
+def window_patch(xs, ys, n_points, yrange=None, customdata=None):
+    """
+    Actualización parcial cuando sólo se movió la ventana de tiempo: se envían
+    únicamente x/y de cada traza (y el rango Y en las vistas con eje común).
+    :param customdata: Nombres de canal del hover del montaje, sólo si cambió el
+                       número de puntos por canal (si no, la figura ya los tiene).
+    """
+    patched = Patch()
+    trace_type = 'scattergl' if use_webgl(n_points) else 'scatter'
+    for i, (x, y) in enumerate(zip(xs, ys)):
+        # Tiempos en float32: resolución de ~1 ms incluso en grabaciones de horas
+        patched['data'][i]['x'] = typed_array(x.astype(np.float32))
+        patched['data'][i]['y'] = typed_array(y.astype(np.float32, copy=False))
+        patched['data'][i]['type'] = trace_type
+        if customdata is not None:
+            patched['data'][i]['customdata'] = customdata[i].tolist()
+    if yrange is not None:
+        patched['layout']['yaxis']['range'] = yrange
+    return patched
+
+
+def theme_patch(view_mode, c):
+    """
+    Actualización parcial cuando sólo cambió el tema: se envían únicamente los
+    colores que update_graph asigna en cada vista.
+    """
+    patched = Patch()
+    patched['layout']['paper_bgcolor'] = c['paper']
+    patched['layout']['plot_bgcolor'] = c['bg']
+    patched['layout']['font']['color'] = c['font']
+    if view_mode == 'única':
+        patched['layout']['xaxis']['gridcolor'] = c['grid']
+        patched['layout']['yaxis']['gridcolor'] = c['grid']
+        patched['layout']['yaxis']['zerolinecolor'] = c['zero']
+    elif view_mode == 'multi':
+        patched['layout']['xaxis']['gridcolor'] = c['grid']
+        patched['layout']['xaxis']['color'] = c['font']
+        patched['layout']['yaxis']['gridcolor'] = c['zero']
+        patched['layout']['yaxis']['color'] = c['font']
+    else:
+        patched['layout']['yaxis']['zerolinecolor'] = c['zero']
+    return patched
 
 
 # =============================================================
@@ -163,6 +279,19 @@ layout = html.Div(className='page-content', children=[
         dbc.Col(width=9, children=[
             html.H2("Visualización EEG", className="section-title"),
 
+            # Selector de grabación
+            html.Div(className="mb-2", children=[
+                dbc.Label(
+                    "Grabación:",
+                    style={"fontSize": "0.82rem", "fontWeight": "500"}
+                ),
+                dcc.Dropdown(
+                    id='dataset-selector',
+                    options=[{'label': name, 'value': name} for name in recording_options],
+                    value=DEFAULT_RECORDING, clearable=False,
+                ),
+            ]),
+
             # Selector de rango de tiempo
             html.Div(className="mb-2", children=[
                 dbc.Label(
@@ -173,13 +302,7 @@ layout = html.Div(className='page-content', children=[
                     id='time-range-slider',
                     min=0, max=MAX_DURATION, step=1,
                     value=[0, 10],
-                    marks={
-                        i: f'{i}s'
-                        for i in range(
-                            0, MAX_DURATION + 1,
-                            max(30, int(MAX_DURATION / 5))
-                        )
-                    },
+                    marks=slider_marks(MAX_DURATION),
                     tooltip={"placement": "bottom", "always_visible": False},
                 ),
             ]),
@@ -200,6 +323,29 @@ layout = html.Div(className='page-content', children=[
                     value=0.5, clearable=False,
                     style={"width": "80px", "display": "inline-block"}
                 ),
+                html.Span("Resolución:", className="speed-label ms-2"),
+                dcc.Dropdown(
+                    id='resolution-mode',
+                    options=[
+                        {'label': 'Envolvente mín/máx', 'value': 'minmax'},
+                        {'label': 'LTTB', 'value': 'lttb'},
+                        {'label': 'Completa', 'value': 'full'},
+                    ],
+                    value='minmax', clearable=False,
+                    style={"width": "170px", "display": "inline-block"}
+                ),
+                dbc.Checklist(
+                    id='fixed-scale',
+                    options=[{'label': 'Escala fija', 'value': 'fixed'}],
+                    value=[], switch=True, inline=True,
+                    className="speed-label ms-2 d-inline-block",
+                ),
+                dbc.Checklist(
+                    id='client-playback',
+                    options=[{'label': 'En el navegador', 'value': 'client'}],
+                    value=[], switch=True, inline=True,
+                    className="speed-label ms-2 d-inline-block",
+                ),
                 html.Span(id='playback-status', className="speed-label ms-2"),
             ]),
 
@@ -311,6 +457,19 @@ layout = html.Div(className='page-content', children=[
         disabled=True, n_intervals=0
     ),
     dcc.Store(id='playback-state', data={'playing': False, 'position': 0}),
+
+    # Reproducción en el navegador: el servidor envía bloques de señal decimada
+    # y un callback del cliente recorre la ventana sin consultar al servidor
+    dcc.Interval(
+        id='client-playback-interval', interval=500,
+        disabled=True, n_intervals=0
+    ),
+    dcc.Store(id='playback-chunk'),          # Bloque que se está reproduciendo
+    dcc.Store(id='playback-next'),           # Último bloque enviado por el servidor
+    dcc.Store(id='playback-chunk-request'),  # Bloque pedido al servidor {k, n}
+    dcc.Store(id='playback-position'),       # Posición actual (segundos)
+    # Puntos por canal del montaje cuyos nombres (customdata) ya tiene la figura
+    dcc.Store(id='montage-points'),
 ])
 
 
@@ -330,16 +489,42 @@ def toggle_tools(view_mode):
     return {'display': 'none'}, {'display': 'block'}
 
 
+# Cambiar de grabación: canales y duración de la nueva grabación
+@dash.callback(
+    Output('signal-selector', 'options'),
+    Output('signal-selector', 'value'),
+    Output('channel-selector', 'options'),
+    Output('channel-selector', 'value', allow_duplicate=True),
+    Output('time-range-slider', 'max'),
+    Output('time-range-slider', 'marks'),
+    Output('time-range-slider', 'value', allow_duplicate=True),
+    Input('dataset-selector', 'value'),
+    State('time-range-slider', 'value'),
+    prevent_initial_call=True
+)
+def select_dataset(name, time_range):
+    store = datasets.get(name).store
+    channels = store.channels
+    options = [{'label': s, 'value': s} for s in channels]
+    duration = int(store.duration)
+    window = min(time_range[1] - time_range[0], duration)
+    return (
+        options, channels[0], options, channels[:24],
+        duration, slider_marks(duration), [0, window]
+    )
+
+
 # Botones de seleccionar todo / ninguno en canales
 @dash.callback(
     Output('channel-selector', 'value'),
     Input('select-all-channels', 'n_clicks'),
     Input('clear-channels', 'n_clicks'),
+    State('dataset-selector', 'value'),
     prevent_initial_call=True
 )
-def update_channels(select_all, clear):
+def update_channels(select_all, clear, name):
     btn = callback_context.triggered[0]['prop_id'].split('.')[0]
-    return signal_options if btn == 'select-all-channels' else []
+    return datasets.get(name).store.channels if btn == 'select-all-channels' else []
 
 
 # Actualizar panel educativo según filtro y modo de vista
@@ -353,8 +538,9 @@ def update_edu(filter_band, view_mode):
         return [
             html.H6("Exploración multicanal"),
             html.P(
-                "Cada canal con su propio color. Observa cómo diferentes "
-                "partes del cerebro se activan de manera distinta.",
+                "Cada canal ocupa su propio renglón (o su propio trazo en la "
+                "vista superpuesta). Observa cómo diferentes partes del "
+                "cerebro se activan de manera distinta.",
                 style={"fontSize": "0.88rem"}
             ),
         ]
@@ -382,25 +568,214 @@ def update_view_info(view_mode):
 @dash.callback(
     Output('playback-interval', 'disabled'),
     Output('playback-interval', 'interval'),
+    Output('client-playback-interval', 'disabled'),
+    Output('client-playback-interval', 'interval'),
     Output('playback-status', 'children'),
     Output('playback-state', 'data'),
+    Output('playback-position', 'data', allow_duplicate=True),
+    Output('playback-chunk-request', 'data', allow_duplicate=True),
+    Output('time-range-slider', 'value', allow_duplicate=True),
     Input('btn-play', 'n_clicks'),
     Input('btn-stop', 'n_clicks'),
     State('playback-speed', 'value'),
     State('time-range-slider', 'value'),
+    State('time-range-slider', 'max'),
+    State('client-playback', 'value'),
     State('playback-state', 'data'),
+    State('playback-position', 'data'),
     prevent_initial_call=True
 )
-def control_playback(play_clicks, stop_clicks, speed, slider_range, state):
+def control_playback(play_clicks, stop_clicks, speed, slider_range, max_duration, client_mode, state, position):
     triggered = callback_context.triggered[0]['prop_id'].split('.')[0]
     if triggered == 'btn-play':
         window = slider_range[1] - slider_range[0]
         interval_ms = int(500 / (speed / 0.5))
+        client = 'client' in (client_mode or [])
+        new_state = {'playing': True, 'position': slider_range[0], 'window': window}
+        if not client:
+            return (
+                False, interval_ms, True, interval_ms, "▶ Reproduciendo...",
+                new_state, no_update, no_update, no_update
+            )
+        chunk = max(PLAYBACK_CHUNK_SECONDS, 3 * window)
+        new_state.update(client=True, speed=speed, chunk=chunk, duration=max_duration)
+        request = {'k': int(slider_range[0] // chunk), 'n': time.time()}
         return (
-            False, interval_ms, "▶ Reproduciendo...",
-            {'playing': True, 'position': slider_range[0], 'window': window}
+            True, interval_ms, False, interval_ms, "▶ Reproduciendo en el navegador...",
+            new_state, slider_range[0], request, no_update
         )
-    return True, 500, "", {'playing': False, 'position': 0, 'window': 10}
+
+    # En modo navegador, dejar el selector en la última posición reproducida
+    slider = no_update
+    if state and state.get('client') and position is not None:
+        slider = [position, position + state['window']]
+    return (
+        True, 500, True, 500, "",
+        {'playing': False, 'position': 0, 'window': 10}, no_update, no_update, slider
+    )
+
+
+# Descartar los bloques precargados si cambia lo que se grafica
+@dash.callback(
+    Output('playback-chunk', 'data', allow_duplicate=True),
+    Output('playback-next', 'data', allow_duplicate=True),
+    Output('playback-chunk-request', 'data', allow_duplicate=True),
+    Input('signal-selector', 'value'),
+    Input('view-mode', 'value'),
+    Input('filter-selector', 'value'),
+    Input('channel-selector', 'value'),
+    Input('resolution-mode', 'value'),
+    Input('dataset-selector', 'value'),
+    Input('fixed-scale', 'value'),
+    prevent_initial_call=True
+)
+def reset_playback_chunks(*_):
+    return None, None, None
+
+
+# Enviar al navegador el bloque pedido (señal decimada de `chunk` segundos más una ventana)
+@dash.callback(
+    Output('playback-next', 'data'),
+    Input('playback-chunk-request', 'data'),
+    State('playback-state', 'data'),
+    State('signal-selector', 'value'),
+    State('view-mode', 'value'),
+    State('filter-selector', 'value'),
+    State('channel-selector', 'value'),
+    State('resolution-mode', 'value'),
+    State('dataset-selector', 'value'),
+    State('fixed-scale', 'value'),
+    prevent_initial_call=True
+)
+def load_playback_chunk(request, state, signal, view_mode, filter_band, channels, resolution, dataset, scale):
+    if not request or not state or not state.get('client'):
+        return no_update
+    recording = datasets.get(dataset)
+    store = recording.store
+    selected, filter_band = select_traces(store, view_mode, signal, channels, filter_band)
+    picks = store.picks(selected)
+
+    # El bloque k cubre [k * chunk, (k + 1) * chunk + ventana] para que cualquier
+    # ventana que inicie dentro del bloque se pueda dibujar sin el siguiente
+    window = state['window']
+    start = request['k'] * state['chunk']
+    end = min(start + state['chunk'] + window, store.duration)
+    start_idx, end_idx = int(start * store.sfreq), int(end * store.sfreq)
+    n_out = int(PLOT_POINTS * (end - start) / max(window, 1))
+    x_plot, y_plot = plot_window(recording, picks, start_idx, end_idx, resolution, filter_band, n_out)
+    stats = recording.stats(filter_band)
+    fixed = 'fixed' in (scale or [])
+    yrange = groups = names = None
+    if view_mode == 'multi':
+        # Canales ya escalados y desplazados; el navegador los agrupa como montage_traces()
+        y_plot = montage_offsets(y_plot, stats.limits(picks, start_idx, end_idx, fixed))
+        groups = montage_groups(len(y_plot))
+        names = selected
+    else:
+        yrange = stats.yrange(picks, start_idx, end_idx, fixed)
+    points_per_window = y_plot.size * window / max(end - start, 1)
+    return {
+        'k': request['k'], 'n': request['n'],
+        'x': np.round(x_plot, 4).tolist(),
+        'y': np.round(y_plot, 3).tolist(),
+        'type': 'scattergl' if use_webgl(points_per_window) else 'scatter',
+        'yrange': yrange,
+        'groups': groups,
+        'names': names,
+    }
+
+
+# Recorrer la ventana en el navegador; pide el siguiente bloque en cuanto empieza uno nuevo
+dash.clientside_callback(
+    """function(n, state, position, chunk, next, request, figure) {
+        var nu = window.dash_clientside.no_update;
+        if (!state || !state.playing || !state.client || !figure) {
+            return [nu, nu, nu, nu, nu];
+        }
+        var size = state.chunk, win = state.window;
+        var pos = (position === null || position === undefined) ? state.position : position;
+        var k = Math.floor(pos / size);
+        var ready = function(c) {
+            return c && c.k === k && (c.groups || c.x).length === figure.data.length;
+        };
+        var newChunk = nu, newRequest = nu;
+        if (!ready(chunk)) {
+            if (ready(next) && request && next.n === request.n) {
+                chunk = next;
+                newChunk = next;
+            } else {
+                // Esperar el bloque (pedirlo si no se ha pedido)
+                if (!request || request.k !== k) {
+                    newRequest = {k: k, n: Date.now()};
+                }
+                return [nu, nu, nu, newRequest, nu];
+            }
+        }
+
+        // Primer índice con x >= v (búsqueda binaria)
+        var lower = function(xs, v) {
+            var lo = 0, hi = xs.length;
+            while (lo < hi) {
+                var mid = (lo + hi) >> 1;
+                if (xs[mid] < v) { lo = mid + 1; } else { hi = mid; }
+            }
+            return lo;
+        };
+        var fig = Object.assign({}, figure);
+        fig.data = figure.data.map(function(tr, i) {
+            // En el montaje cada traza junta varios canales separados por null
+            var rows = chunk.groups ? chunk.groups[i] : [i];
+            var x = [], y = [], names = [];
+            rows.forEach(function(r) {
+                var xs = chunk.x[r], ys = chunk.y[r];
+                var a = lower(xs, pos), b = lower(xs, pos + win);
+                x = x.concat(xs.slice(a, b));
+                y = y.concat(ys.slice(a, b));
+                if (chunk.groups) {
+                    x.push(null);
+                    y.push(null);
+                    // Nombre del canal en cada punto, para el hover
+                    for (var j = a; j <= b; j++) { names.push(chunk.names[r]); }
+                }
+            });
+            var update = {x: x, y: y, type: chunk.type};
+            if (chunk.groups) {
+                update.customdata = names;
+            }
+            return Object.assign({}, tr, update);
+        });
+        if (chunk.yrange) {
+            fig.layout = Object.assign({}, figure.layout, {
+                yaxis: Object.assign({}, figure.layout.yaxis, {range: chunk.yrange})
+            });
+        }
+
+        // Avanzar (con loop) y precargar el bloque que sigue al actual
+        var newPos = pos + state.speed;
+        if (newPos + win >= state.duration) {
+            newPos = 0;
+        }
+        var kNext = ((k + 1) * size + win >= state.duration) ? 0 : k + 1;
+        if (kNext !== k && !(request && request.k === kNext)) {
+            newRequest = {k: kNext, n: Date.now()};
+        }
+        // Los nombres del hover ya no corresponden a los puntos que envía el servidor
+        return [fig, newPos, newChunk, newRequest, null];
+    }""",
+    Output('eeg-graph', 'figure', allow_duplicate=True),
+    Output('playback-position', 'data'),
+    Output('playback-chunk', 'data'),
+    Output('playback-chunk-request', 'data'),
+    Output('montage-points', 'data', allow_duplicate=True),
+    Input('client-playback-interval', 'n_intervals'),
+    State('playback-state', 'data'),
+    State('playback-position', 'data'),
+    State('playback-chunk', 'data'),
+    State('playback-next', 'data'),
+    State('playback-chunk-request', 'data'),
+    State('eeg-graph', 'figure'),
+    prevent_initial_call=True
+)
 
 
 # Avanzar la ventana de tiempo durante reproducción (con loop)
@@ -410,15 +785,16 @@ def control_playback(play_clicks, stop_clicks, speed, slider_range, state):
     State('playback-state', 'data'),
     State('playback-speed', 'value'),
     State('time-range-slider', 'value'),
+    State('time-range-slider', 'max'),
     prevent_initial_call=True
 )
-def advance_playback(n_intervals, state, speed, current_range):
+def advance_playback(n_intervals, state, speed, current_range, max_duration):
     if not state or not state.get('playing'):
         return no_update
     window = current_range[1] - current_range[0]
     new_start = current_range[0] + speed
     # Loop: volver al inicio al llegar al final
-    if new_start + window >= MAX_DURATION:
+    if new_start + window >= max_duration:
         new_start = 0
     return [new_start, new_start + window]
 
@@ -426,34 +802,63 @@ def advance_playback(n_intervals, state, speed, current_range):
 # Actualizar la gráfica EEG principal
 @dash.callback(
     Output('eeg-graph', 'figure'),
+    Output('montage-points', 'data'),
     Input('signal-selector', 'value'),
     Input('time-range-slider', 'value'),
     Input('view-mode', 'value'),
     Input('theme-store', 'data'),
     Input('filter-selector', 'value'),
-    Input('channel-selector', 'value')
+    Input('channel-selector', 'value'),
+    Input('resolution-mode', 'value'),
+    Input('dataset-selector', 'value'),
+    Input('fixed-scale', 'value'),
+    State('montage-points', 'data'),
 )
-def update_graph(signal, time_range, view_mode, theme, filter_band, channels):
+def update_graph(signal, time_range, view_mode, theme, filter_band, channels, resolution, dataset, scale,
+                 shown_points):
     c = get_colors(theme)
+    recording = datasets.get(dataset)
+    store = recording.store
     start, end = time_range
-    start_idx = int(start * SAMPLE_RATE)
-    end_idx = int(end * SAMPLE_RATE)
+    start_idx = int(start * store.sfreq)
+    end_idx = int(end * store.sfreq)
+    selected, filter_band = select_traces(store, view_mode, signal, channels, filter_band)
+    signal = selected[0]
+
+    # Si sólo cambió el tema o la ventana de tiempo, enviar una actualización
+    # parcial en lugar de reconstruir la figura completa
+    triggered = set(dash.ctx.triggered_prop_ids)
+    if triggered == {'theme-store.data'}:
+        return theme_patch(view_mode, c), no_update
+
+    # Reducir cada trazo al ancho de la gráfica sin perder picos ('full' = sin decimar)
+    picks = store.picks(selected)
+    x_plot, y_plot = plot_window(recording, picks, start_idx, end_idx, resolution, filter_band)
+
+    # Rangos Y a partir de las estadísticas por bloque (sin recorrer las muestras);
+    # con escala fija no cambian entre ventanas
+    stats = recording.stats(filter_band)
+    fixed = 'fixed' in (scale or [])
+    if view_mode == 'multi':
+        yrange = None
+        y_montage = montage_offsets(y_plot, stats.limits(picks, start_idx, end_idx, fixed))
+        xs, ys, names = montage_traces(x_plot, y_montage, selected)
+        points = x_plot.shape[-1]
+    else:
+        yrange = stats.yrange(picks, start_idx, end_idx, fixed)
+        xs, ys, names = list(x_plot), list(y_plot), None
+        points = None
+    if triggered == {'time-range-slider.value'}:
+        # Los nombres por punto sólo cambian si cambia el número de puntos por canal
+        customdata = names if points != shown_points else None
+        return window_patch(xs, ys, y_plot.size, yrange, customdata), points
 
     # --- Vista única ---
     if view_mode == 'única':
-        raw_filtered = raw.copy()
-        if filter_band in BANDS:
-            raw_filtered.filter(
-                *BANDS[filter_band],
-                fir_design='firwin', verbose='ERROR'
-            )
-        ch_idx = raw.ch_names.index(signal)
-        data_arr, times = raw_filtered[ch_idx, start_idx:end_idx]
-        times = times.flatten()
-        y = data_arr[0]
+        y = y_plot[0]
 
-        return go.Figure(
-            data=[go.Scatter(x=times, y=y, mode='lines', line=dict(width=1.2))],
+        fig = go.Figure(
+            data=[line_trace(x_plot[0], y, line=dict(width=1.2))],
             layout=go.Layout(
                 title=dict(text=signal, font=dict(size=13)),
                 xaxis=dict(
@@ -463,7 +868,7 @@ def update_graph(signal, time_range, view_mode, theme, filter_band, channels):
                 yaxis=dict(
                     title='Amplitud (µV)',
                     gridcolor=c['grid'],
-                    range=symmetric_yrange(y),
+                    range=yrange,
                     zeroline=True,
                     zerolinecolor=c['zero'], zerolinewidth=1.5
                 ),
@@ -473,68 +878,46 @@ def update_graph(signal, time_range, view_mode, theme, filter_band, channels):
                 margin=dict(t=35, l=60, r=20, b=50),
             )
         )
+        return fig, points
 
     # --- Vista multicanal ---
     elif view_mode == 'multi':
-        selected = channels if channels else [DEFAULT_SIGNAL]
-        picks = [raw.ch_names.index(ch) for ch in selected]
-        data_arr, times = raw[picks, start_idx:end_idx]
-        times = times.flatten()
-
-        step = 1.0 / len(selected)
-        height = max(650, len(selected) * 50)
+        # Montaje: canales apilados en un solo eje, etiquetados con tickvals/ticktext
+        n = len(selected)
+        traces = [
+            line_trace(
+                x, y, n_points=y_plot.size, customdata=cd,
+                hovertemplate='%{customdata}<br>%{x:.3f} s<extra></extra>', line=dict(width=0.8)
+            )
+            for x, y, cd in zip(xs, ys, names)
+        ]
         layout_fig = go.Layout(
             showlegend=False,
             paper_bgcolor=c['paper'], plot_bgcolor=c['bg'],
-            autosize=False, height=height,
-            margin=dict(t=35, l=60, r=20, b=35),
+            autosize=False, height=max(650, n * 50),
+            margin=dict(t=35, l=70, r=20, b=35),
             xaxis=dict(
                 title='Tiempo (s)', side='top',
                 showgrid=True, gridcolor=c['grid'],
                 zeroline=False, color=c['font']
             ),
+            yaxis=dict(
+                tickvals=list(range(n - 1, -1, -1)), ticktext=selected,
+                range=[-0.6, n - 0.4],
+                showgrid=True, gridcolor=c['zero'], gridwidth=0.5,
+                zeroline=False, color=c['font'], tickfont=dict(size=9)
+            ),
+            font=dict(family="Outfit", color=c['font'], size=11),
         )
-
-        traces = []
-        annotations = []
-        for ii, ch in enumerate(selected):
-            domain = [1 - (ii + 1) * step, 1 - ii * step]
-            axis_id = '' if ii == 0 else str(ii + 1)
-
-            # Crear eje Y individual para cada canal
-            layout_fig[f'yaxis{axis_id}'] = go.layout.YAxis(
-                domain=domain, showticklabels=False,
-                zeroline=True, zerolinecolor=c['zero'],
-                zerolinewidth=0.5, gridcolor=c['grid']
-            )
-            traces.append(go.Scatter(
-                x=times, y=data_arr[ii],
-                yaxis=f'y{axis_id}',
-                mode='lines', line=dict(width=0.8)
-            ))
-            annotations.append(go.layout.Annotation(
-                x=-0.06, y=sum(domain) / 2,
-                xref='paper', yref=f'y{axis_id}',
-                text=ch, showarrow=False,
-                font=dict(size=9, color=c['font'])
-            ))
-
-        layout_fig.annotations = annotations
-        layout_fig.font = dict(family="Outfit", color=c['font'], size=11)
-        return go.Figure(data=traces, layout=layout_fig)
+        return go.Figure(data=traces, layout=layout_fig), points
 
     # --- Vista superpuesta ---
     else:
-        selected = channels if channels else [DEFAULT_SIGNAL]
-        picks = [raw.ch_names.index(ch) for ch in selected]
-        data_arr, times = raw[picks, start_idx:end_idx]
-        times = times.flatten()
-
         fig = go.Figure()
         for i, ch in enumerate(selected):
-            fig.add_trace(go.Scatter(
-                x=times, y=data_arr[i],
-                name=ch, mode='lines', line=dict(width=1)
+            fig.add_trace(line_trace(
+                x_plot[i], y_plot[i], n_points=y_plot.size,
+                name=ch, line=dict(width=1)
             ))
 
         fig.update_layout(
@@ -542,7 +925,7 @@ def update_graph(signal, time_range, view_mode, theme, filter_band, channels):
             xaxis_title="Tiempo (s)",
             yaxis_title="Amplitud (µV)",
             yaxis=dict(
-                range=symmetric_yrange(data_arr.flatten()),
+                range=yrange,
                 zeroline=True,
                 zerolinecolor=c['zero'], zerolinewidth=1.5
             ),
@@ -551,4 +934,4 @@ def update_graph(signal, time_range, view_mode, theme, filter_band, channels):
             height=650,
             margin=dict(t=35, l=60, r=20, b=50),
         )
-        return fig
+        return fig, points
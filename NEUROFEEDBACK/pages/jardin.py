@@ -5,9 +5,6 @@
 
 import os
 import sys
-import time
-import threading
-from collections import deque
 
 import dash
 from dash import html, dcc, Input, Output, State, no_update
@@ -20,11 +17,12 @@ parent_dir = os.path.dirname(current_dir)
 if parent_dir not in sys.path:
     sys.path.append(parent_dir)
 
-from modules.neurosky_data_collector import NeuroSkyDataCollector, validate_signal_type
+from modules import acquisition_hub
+from modules.neurosky_data_collector import validate_signal_type
+from modules.plot_utils import get_colors as gc, line_trace
 
-LIVE_DATA_BUFFER_JARDIN = deque()
-COLLECTOR_JARDIN = None
-THREAD_JARDIN = None
+SUBSCRIPTION_JARDIN = None  # Lector de la diadema compartida (acquisition_hub)
+MAX_POINTS = 512  # Puntos visibles en la gráfica en vivo
 dash.register_page(__name__, path="/jardin")
 
 SIGS = [
@@ -42,19 +40,11 @@ SIGS = [
     'mid-gamma']
 
 
-def gc(theme):
-    if theme == 'dark':
-        return {'bg': '#222', 'paper': '#222', 'font': '#fff',
-                'grid': 'rgba(255,255,255,0.08)', 'zero': 'rgba(255,255,255,0.2)', 'trace': '#4DA8DA'}
-    return {'bg': '#fff', 'paper': '#fff', 'font': '#212529',
-            'grid': 'rgba(0,0,0,0.06)', 'zero': 'rgba(0,0,0,0.15)', 'trace': '#375a7f'}
-
-
 def empty_fig(st, theme, title="Esperando datos..."):
     c = gc(theme)
     yr = [0, 100] if st in ['attention', 'meditation'] else (
         [-2048, 2048] if st == 'raw' else None)
-    return go.Figure(data=[go.Scatter(y=[], mode='lines', line=dict(color=c['trace'], width=1.5))],
+    return go.Figure(data=[line_trace(y=[], n_points=MAX_POINTS, line=dict(color=c['trace'], width=1.5))],
                      layout=go.Layout(title=dict(text=title, font=dict(size=11)),
                                       xaxis=dict(title='Tiempo (s)', gridcolor=c['grid']),
                                       yaxis=dict(
@@ -63,16 +53,6 @@ def empty_fig(st, theme, title="Esperando datos..."):
         font=dict(family="Outfit", color=c['font'], size=10), margin=dict(t=30, l=40, r=15, b=30)))
 
 
-def collect_buf(ci, buf):
-    while ci.running:
-        try:
-            buf.append(ci.get_signal_value(ci.signal_type))
-            time.sleep(1.0 / ci.sample_freq)
-        except Exception as e:
-            if ci.running:
-                print(f"Error (Jardín): {e}")
-
-
 # Game HTML with theme support
 GAME_HTML = """<!DOCTYPE html><html><head><style>
 *{margin:0;padding:0;box-sizing:border-box}
@@ -223,7 +203,7 @@ layout = html.Div(className='page-content', children=[
                 dbc.Label("Puerto:", style={"fontSize": "0.8rem", "fontWeight": "500"}),
                 dbc.Input(
                     id="rt-com-port-jardin",
-                    placeholder="COM3",
+                    placeholder="COM3 o sim",
                     type="text",
                     className="mb-2"),
                 dbc.Label("Señal:", style={"fontSize": "0.8rem", "fontWeight": "500"}),
@@ -274,7 +254,7 @@ layout = html.Div(className='page-content', children=[
                                                            'value'), State('theme-store', 'data'),
                prevent_initial_call=True)
 def manage_j(cc, sc, port, st, theme):
-    global COLLECTOR_JARDIN, THREAD_JARDIN
+    global SUBSCRIPTION_JARDIN
     tid = dash.ctx.triggered_id
     if tid == 'rt-connect-jardin':
         if not port:
@@ -285,32 +265,22 @@ def manage_j(cc, sc, port, st, theme):
         except ValueError as e:
             return html.Span(
                 str(e), className="status-badge disconnected"), True, empty_fig(st, theme, "Error")
-        if COLLECTOR_JARDIN and COLLECTOR_JARDIN.running:
-            COLLECTOR_JARDIN.stop()
-            if THREAD_JARDIN and THREAD_JARDIN.is_alive():
-                THREAD_JARDIN.join()
-        LIVE_DATA_BUFFER_JARDIN.clear()
+        # La suscripción anterior se cancela después de la nueva (misma diadema: no se reabre el puerto)
+        prev, SUBSCRIPTION_JARDIN = SUBSCRIPTION_JARDIN, None
         try:
-            COLLECTOR_JARDIN = NeuroSkyDataCollector(
-                port=port, signal_type=st, save_to_csv=False)
-            COLLECTOR_JARDIN.connect()
-            COLLECTOR_JARDIN.running = True
-            THREAD_JARDIN = threading.Thread(target=collect_buf, args=(
-                COLLECTOR_JARDIN, LIVE_DATA_BUFFER_JARDIN), daemon=True)
-            THREAD_JARDIN.start()
+            SUBSCRIPTION_JARDIN = acquisition_hub.subscribe(port, st)
             return html.Span([html.Span(
                 className="dot"), f" {port}"], className="status-badge connected"), False, empty_fig(st, theme, st.capitalize())
         except Exception as e:
-            if COLLECTOR_JARDIN:
-                COLLECTOR_JARDIN.running = False
             return html.Span(
                 f"Error: {e}", className="status-badge disconnected"), True, empty_fig(st, theme, f"Error")
+        finally:
+            if prev:
+                prev.close()
     elif tid == 'rt-stop-jardin':
-        if COLLECTOR_JARDIN and COLLECTOR_JARDIN.running:
-            COLLECTOR_JARDIN.stop()
-            if THREAD_JARDIN and THREAD_JARDIN.is_alive():
-                THREAD_JARDIN.join()
-            LIVE_DATA_BUFFER_JARDIN.clear()
+        if SUBSCRIPTION_JARDIN:
+            SUBSCRIPTION_JARDIN.close()
+            SUBSCRIPTION_JARDIN = None
             return html.Span(
                 "Detenido.", className="status-badge disconnected"), True, empty_fig(st, theme, "Detenido")
         return html.Span(
@@ -322,16 +292,13 @@ def manage_j(cc, sc, port, st, theme):
                Output('jardin-signal-value', 'children'),
                Input('rt-interval-jardin', 'n_intervals'), prevent_initial_call=True)
 def upd_j(n):
-    pts = []
-    while True:
-        try:
-            pts.append(LIVE_DATA_BUFFER_JARDIN.popleft())
-        except IndexError:
-            break
-    if not pts:
+    if SUBSCRIPTION_JARDIN is None:
+        return no_update, no_update, no_update
+    _, pts = SUBSCRIPTION_JARDIN.read(MAX_POINTS)
+    if not len(pts):
         return no_update, no_update, no_update
     lat = int(pts[-1])
-    return ({'y': [pts]}, [0], 512), lat, str(lat)
+    return ({'y': [pts.tolist()]}, [0], MAX_POINTS), lat, str(lat)
 
 
 # Send signal + theme to iframe
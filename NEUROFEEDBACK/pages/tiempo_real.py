@@ -7,9 +7,6 @@ import dash_bootstrap_components as dbc
 import plotly.graph_objs as go
 import os
 import sys
-import time
-import threading
-from collections import deque
 
 # Agregar directorio raíz al path para importar módulos
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -17,14 +14,16 @@ parent_dir = os.path.dirname(current_dir)
 if parent_dir not in sys.path:
     sys.path.append(parent_dir)
 
-from modules.neurosky_data_collector import NeuroSkyDataCollector, validate_signal_type
+from modules import acquisition_hub
+from modules.neurosky_data_collector import validate_signal_type
+from modules.plot_utils import get_colors, line_trace
 
 # =============================================================
 # Estado global de conexión
 # =============================================================
-LIVE_DATA_BUFFER = deque()
-global_collector = None
-collector_thread = None
+# Lector de la diadema (el hub de acquisition_hub comparte la conexión con las demás páginas)
+subscription = None
+MAX_POINTS = 512  # Puntos visibles en la gráfica en vivo
 
 dash.register_page(__name__, path="/tiempo-real", name="Tiempo Real")
 
@@ -55,23 +54,6 @@ SIGNAL_INFO = {
 # =============================================================
 # Funciones auxiliares
 # =============================================================
-def get_colors(theme):
-    """Retorna colores de gráfica según el tema."""
-    if theme == 'dark':
-        return {
-            'bg': '#222', 'paper': '#222', 'font': '#fff',
-            'grid': 'rgba(255,255,255,0.08)',
-            'zero': 'rgba(255,255,255,0.2)',
-            'trace': '#4DA8DA',
-        }
-    return {
-        'bg': '#fff', 'paper': '#fff', 'font': '#212529',
-        'grid': 'rgba(0,0,0,0.06)',
-        'zero': 'rgba(0,0,0,0.15)',
-        'trace': '#375a7f',
-    }
-
-
 def create_empty_figure(signal_type, theme, title="Esperando datos..."):
     """Crea una figura vacía con ejes configurados según el tipo de señal."""
     c = get_colors(theme)
@@ -84,8 +66,8 @@ def create_empty_figure(signal_type, theme, title="Esperando datos..."):
         y_range = [0, 100]
 
     return go.Figure(
-        data=[go.Scatter(
-            y=[], mode='lines',
+        data=[line_trace(
+            y=[], n_points=MAX_POINTS,
             line=dict(color=c['trace'], width=1.5)
         )],
         layout=go.Layout(
@@ -106,20 +88,6 @@ def create_empty_figure(signal_type, theme, title="Esperando datos..."):
     )
 
 
-def collect_data(collector_instance):
-    """Hilo de recolección: lee datos de la diadema y los agrega al buffer."""
-    while collector_instance.running:
-        try:
-            value = collector_instance.get_signal_value(
-                collector_instance.signal_type
-            )
-            LIVE_DATA_BUFFER.append(value)
-            time.sleep(1.0 / collector_instance.sample_freq)
-        except Exception as e:
-            if collector_instance.running:
-                print(f"Error en hilo de recolección: {e}")
-
-
 # =============================================================
 # Layout
 # =============================================================
@@ -137,7 +105,7 @@ layout = html.Div(className='page-content', children=[
                     ),
                     dbc.Input(
                         id="rt-com-port-input",
-                        placeholder="COM3 o /dev/ttyUSB0",
+                        placeholder="COM3, /dev/ttyUSB0 o sim (simulada)",
                         type="text", className="mb-2"
                     ),
                     dbc.Label(
@@ -234,7 +202,7 @@ def update_signal_info(signal_type):
     prevent_initial_call=True
 )
 def manage_connection(connect_clicks, stop_clicks, port, signal_type, theme):
-    global global_collector, collector_thread
+    global subscription
     triggered = dash.ctx.triggered_id
 
     if triggered == 'rt-connect-button':
@@ -256,27 +224,12 @@ def manage_connection(connect_clicks, stop_clicks, port, signal_type, theme):
                 create_empty_figure(signal_type, theme, "Error")
             )
 
-        # Detener conexión anterior si existe
-        if global_collector and global_collector.running:
-            global_collector.stop()
-            if collector_thread and collector_thread.is_alive():
-                collector_thread.join()
-        LIVE_DATA_BUFFER.clear()
-
-        # Intentar nueva conexión
+        # Suscribirse (se conecta a la diadema si ninguna otra página lo ha hecho).
+        # La suscripción anterior se cancela después, para que al cambiar de señal
+        # en la misma diadema el hub no cierre y vuelva a abrir el puerto
+        previous, subscription = subscription, None
         try:
-            global_collector = NeuroSkyDataCollector(
-                port=port, signal_type=signal_type, save_to_csv=False
-            )
-            global_collector.connect()
-            global_collector.running = True
-
-            collector_thread = threading.Thread(
-                target=collect_data,
-                args=(global_collector,),
-                daemon=True
-            )
-            collector_thread.start()
+            subscription = acquisition_hub.subscribe(port, signal_type)
 
             return (
                 html.Span(
@@ -287,20 +240,19 @@ def manage_connection(connect_clicks, stop_clicks, port, signal_type, theme):
                 create_empty_figure(signal_type, theme, f"{signal_type.capitalize()}")
             )
         except Exception as e:
-            if global_collector:
-                global_collector.running = False
             return (
                 html.Span(f"Error: {e}", className="status-badge disconnected"),
                 True,
                 create_empty_figure(signal_type, theme, f"Error: {e}")
             )
+        finally:
+            if previous:
+                previous.close()
 
     elif triggered == 'rt-stop-button':
-        if global_collector and global_collector.running:
-            global_collector.stop()
-            if collector_thread and collector_thread.is_alive():
-                collector_thread.join()
-            LIVE_DATA_BUFFER.clear()
+        if subscription:
+            subscription.close()
+            subscription = None
             return (
                 html.Span("Detenido.", className="status-badge disconnected"),
                 True,
@@ -314,23 +266,20 @@ def manage_connection(connect_clicks, stop_clicks, port, signal_type, theme):
     return no_update, no_update, no_update
 
 
-# Actualizar gráfica con nuevos datos del buffer
+# Actualizar gráfica con las muestras nuevas de la suscripción
 @dash.callback(
     Output('rt-live-graph', 'extendData'),
     Input('rt-interval-component', 'n_intervals'),
     prevent_initial_call=True
 )
 def update_graph(n_intervals):
-    # Vaciar buffer de puntos nuevos
-    new_points = []
-    while True:
-        try:
-            new_points.append(LIVE_DATA_BUFFER.popleft())
-        except IndexError:
-            break
+    if subscription is None:
+        return no_update
+    # Sólo las últimas MAX_POINTS muestras nuevas llegan a verse
+    _, new_points = subscription.read(MAX_POINTS)
 
-    if not new_points:
+    if not len(new_points):
         return no_update
 
-    # Enviar datos a la traza 0; mantener últimos 512 puntos
-    return ({'y': [new_points]}, [0], 512)
+    # Enviar datos a la traza 0; mantener últimos MAX_POINTS puntos
+    return ({'y': [new_points.tolist()]}, [0], MAX_POINTS)